@@ -0,0 +1,646 @@
+"""
+Infinite Cat Jumper - benchmarks
+Runs headless performance measurements against game.py.
+
+Usage:
+    python benchmark.py import        # Cold import time of the game module.
+    python benchmark.py memory        # Memory of 100k platforms and items, and their field access time.
+    python benchmark.py motion        # Per-tick cost of the level motion kernels.
+    python benchmark.py assets        # Image load times with an empty and a filled cache.
+    python benchmark.py rng           # Level 1/2 motion with direct Generator draws vs a RandomBuffer.
+    python benchmark.py orbit         # Level 3 motion: per-object trig vs vectorized trig vs recurrence.
+    python benchmark.py blits         # Per-object draw cost: one blit per object vs one blits call.
+    python benchmark.py cull          # Platform draw list cost vs world size, with and without culling.
+    python benchmark.py worldgen      # Cost of GameSimulation.generate, inline vs background thread.
+    python benchmark.py collision     # Per-tick cost of Player.update vs platform count.
+    python benchmark.py collect       # Per-tick cost of Player.collect vs item count.
+    python benchmark.py levels        # Per-level throughput, checked against the baselines.
+    python benchmark.py levels --save # ... and store the results as the new baselines.
+    python benchmark.py profile       # Per-phase frame times of each level.
+    python benchmark.py determinism   # Checks that replays and threaded world generation match.
+    (add --dirty to levels/profile to present frames with dirty rectangles)
+
+The baselines in bench_baseline.json are absolute rates measured on one
+machine, so they only mean something there: run "levels --save" once on
+your own machine (and again after intended performance changes) before
+relying on the regression check.
+"""
+
+# Importing required modules:
+# os: for the headless SDL drivers and paths.
+# sys: for the interpreter path and exit codes.
+# time: for timing.
+# statistics: for medians.
+# subprocess: for starting fresh interpreters (cold imports).
+# argparse: for the command line.
+# json: for the baseline file.
+import os, sys, time, statistics, subprocess, argparse, json
+
+# Run pygame without a window or audio device.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# Directory containing game.py.
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Frame budget at 60 FPS, in milliseconds.
+FRAME_MS = 1000 / 60
+
+# File storing the per-level throughput baselines (machine-specific, see above).
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+
+def bench_import(runs=10):
+    """
+    Measures the cold import time of game.py in fresh interpreters.
+    Returns the median import time in milliseconds, with and without pygame itself.
+    """
+    code = ("import time; t = time.perf_counter(); import pygame; "
+            "p = time.perf_counter(); import game; e = time.perf_counter(); "
+            "print((e - t) * 1000, (e - p) * 1000)")
+    totals, own = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                             capture_output=True, text=True, check=True).stdout
+        t, g = out.split()[-2:]
+        totals.append(float(t))
+        own.append(float(g))
+    return {"total_ms": statistics.median(totals), "game_only_ms": statistics.median(own)}
+
+def bench_assets():
+    """
+    Loads the game's images through game.Assets twice with a fresh cache folder:
+    the first load scales the sources, the second one reads the prescaled cache.
+    Returns [(first report, second report)] lines per asset.
+    """
+    import tempfile
+    import pygame
+    import game
+    os.chdir(HERE)  # The asset paths are relative to the game folder.
+    pygame.init()
+    pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = []
+        for _ in range(2):
+            assets = game.Assets(tmp)
+            assets.image("cat.png", (50, 50), game.WHITE)
+            assets.image("obtainable.png", (30, 30), game.GREEN)
+            runs.append(assets.report())
+    pygame.quit()
+    return list(zip(*runs))
+
+def bench_memory(n=100000):
+    """
+    Measures with tracemalloc the memory taken by `n` platforms in a PlatformArray
+    (views and rows) and by `n` items attached to them.
+    Returns {"platforms": MiB, "items": MiB}.
+    """
+    import tracemalloc
+    import game
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    plats = game.PlatformArray(n)
+    for i in range(n):
+        plats.append(game.Platform(i % 700, -5 * i, 60))
+    mid = tracemalloc.get_traced_memory()[0]
+    items = game.ItemStore(plats)
+    for p in plats:
+        items.append(game.Item(p.x, p.y - 30, p))
+    end = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"platforms": (mid - start) / 2**20, "items": (end - mid) / 2**20}
+
+def bench_attrs(n=1000000):
+    """
+    Times the field accesses Player.update and Player.collect make, on the
+    real (__slots__) Player and Item and on plain copies with a __dict__:
+    a Player position/velocity read+write and an Item overlap test.
+    Returns {"player": (dict ns, slots ns), "item": (dict ns, slots ns)}.
+    """
+    import game
+
+    class Plain:
+        """An object with a per-instance __dict__ holding the same fields."""
+        def __init__(self, obj):
+            for name in type(obj).__slots__:
+                if hasattr(obj, name):
+                    setattr(self, name, getattr(obj, name))
+
+    def player_loop(p):
+        t = time.perf_counter()
+        for _ in range(n):
+            p.vy += 1
+            p.y += p.vy
+        return (time.perf_counter() - t) * 1e9 / n
+
+    def item_loop(it, px, py, pw, ph):
+        t = time.perf_counter()
+        for _ in range(n):
+            if it.x < px + pw and px < it.x + it.w and it.y < py + ph and py < it.y + it.h:
+                pass
+        return (time.perf_counter() - t) * 1e9 / n
+
+    player = game.Player(game.WIDTH // 2, game.HEIGHT - 100)
+    item = game.Item(0, 0)
+    res = {}
+    res["player"] = tuple(min(player_loop(obj) for _ in range(3))
+                          for obj in (Plain(player), player))
+    res["item"] = tuple(min(item_loop(obj, player.x, player.y, player.w, player.h) for _ in range(3))
+                        for obj in (Plain(item), item))
+    return res
+
+def stress_platforms(n, lvl):
+    """
+    Builds a PlatformArray with `n` platforms spread over the screen,
+    set up for the given level's motion.
+    """
+    import random, math
+    import game
+    phys = game.Physics()
+    plats = game.PlatformArray()
+    for _ in range(n):
+        p = game.gen_platform(random.uniform(0, game.HEIGHT), 0)
+        plats.append(p)
+        if lvl == 2:
+            p.vx = random.choice(phys.speeds)
+            p.vy = random.choice(phys.speeds)
+        elif lvl == 3:
+            p.radius    = random.randint(50, 150)
+            p.angle     = random.uniform(0, 2 * math.pi)
+            p.cx        = game.WIDTH // 2 + random.randint(-100, 100)
+            p.cy        = p.y
+            p.rot_speed = random.uniform(*phys.rot)
+    return plats
+
+def bench_motion(counts=(100, 1000, 10000), ticks=200):
+    """
+    Times each level's motion kernel for several platform counts.
+    Returns {(level, count): milliseconds per tick}.
+    """
+    import numpy as np
+    import game
+    phys = game.Physics()
+    rng = np.random.default_rng(0)
+    res = {}
+    for n in counts:
+        for lvl in (1, 2, 3):
+            plats = stress_platforms(n, lvl)
+            kernel = {1: lambda: plats.slide_step(phys, rng),
+                      2: lambda: plats.bounce_step(phys, rng),
+                      3: plats.orbit_step}[lvl]
+            t = time.perf_counter()
+            for _ in range(ticks):
+                kernel()
+            res[(lvl, n)] = (time.perf_counter() - t) * 1000 / ticks
+    return res
+
+def bench_rng(counts=(15, 100, 1000), ticks=2000):
+    """
+    Times the level 1 and 2 motion kernels drawing their random numbers straight
+    from a NumPy Generator and through a game.RandomBuffer.
+    Returns {(level, count): (Generator us, RandomBuffer us) per tick}.
+    """
+    import numpy as np
+    import game
+    phys = game.Physics()
+    res = {}
+    for n in counts:
+        for lvl in (1, 2):
+            times = []
+            for buffered in (False, True):
+                plats = stress_platforms(n, lvl)
+                rng = np.random.default_rng(0)
+                if buffered:
+                    rng = game.RandomBuffer(rng)
+                step = plats.slide_step if lvl == 1 else plats.bounce_step
+                t = time.perf_counter()
+                for _ in range(ticks):
+                    step(phys, rng)
+                times.append((time.perf_counter() - t) * 1e6 / ticks)
+            res[(lvl, n)] = tuple(times)
+    return res
+
+def bench_orbit(counts=(100, 1000, 10000), ticks=200):
+    """
+    Times three ways of moving level 3 platforms one step: math.cos/math.sin per
+    platform (the original loop), np.cos/np.sin over the columns, and the
+    rotation recurrence of PlatformArray.orbit_step.
+    The per-object loop runs on plain Python objects holding float fields, like
+    the original list of Platforms, not through the PlatformArray column views.
+    Returns {count: (per-object ms, vectorized trig ms, recurrence ms) per tick}.
+    """
+    import math
+    import numpy as np
+
+    class Orbiter:
+        """A plain platform with the fields the orbit step uses."""
+        def __init__(self, p):
+            self.x, self.y, self.w, self.h = p.x, p.y, p.w, p.h
+            self.cx, self.cy, self.radius = p.cx, p.cy, p.radius
+            self.angle, self.rot_speed = p.angle, p.rot_speed
+
+    res = {}
+    for n in counts:
+        plats = stress_platforms(n, 3)
+        objs = [Orbiter(p) for p in plats]
+        t = time.perf_counter()
+        for _ in range(ticks):
+            for p in objs:
+                p.x = p.cx + p.radius * math.cos(p.angle) - p.w / 2
+                p.y = p.cy + p.radius * math.sin(p.angle) - p.h / 2
+                p.angle += p.rot_speed
+        per_object = (time.perf_counter() - t) * 1000 / ticks
+        t = time.perf_counter()
+        for _ in range(ticks):
+            angle, radius = plats.angle[:n], plats.radius[:n]
+            plats.x[:n] = plats.cx[:n] + radius * np.cos(angle) - plats.w[:n] / 2
+            plats.y[:n] = plats.cy[:n] + radius * np.sin(angle) - plats.h[:n] / 2
+            angle += plats.rot_speed[:n]
+        trig = (time.perf_counter() - t) * 1000 / ticks
+        t = time.perf_counter()
+        for _ in range(ticks):
+            plats.orbit_step()
+        res[n] = (per_object, trig, (time.perf_counter() - t) * 1000 / ticks)
+    return res
+
+def bench_collision(counts=(100, 1000, 10000), ticks=2000):
+    """
+    Times Player.update against level 1 worlds of increasing platform density.
+    Returns {count: microseconds per update}.
+    """
+    import game
+    res = {}
+    for n in counts:
+        plats = stress_platforms(n, 1)
+        player = game.Player(game.WIDTH // 2, game.HEIGHT // 2)
+        t = time.perf_counter()
+        for i in range(ticks):
+            # Keep the player bouncing around the middle of the screen.
+            if player.y > game.HEIGHT * 0.75 or i % 40 == 0:
+                player.y = game.HEIGHT // 4
+                player.vy = 0
+            player.update(plats)
+        res[n] = (time.perf_counter() - t) * 1e6 / ticks
+    return res
+
+def bench_collect(counts=(100, 1000, 10000), ticks=2000):
+    """
+    Times Player.collect with one item on every platform, none of them touching the player.
+    Returns {item count: microseconds per call}.
+    """
+    import game
+    res = {}
+    for n in counts:
+        plats = stress_platforms(n, 1)
+        items = game.ItemStore(plats)
+        for p in plats:
+            items.append(game.Item(p.x, p.y - 30, p))
+        # Park the player where it can't reach any item so the store stays the same size.
+        player = game.Player(game.WIDTH // 2, -10 * game.HEIGHT)
+        t = time.perf_counter()
+        for _ in range(ticks):
+            player.collect(items, 0)
+        res[n] = (time.perf_counter() - t) * 1e6 / ticks
+    return res
+
+def scripted_inputs(i):
+    """Returns the scripted Inputs for tick `i`: double jump regularly while sweeping left and right."""
+    import game
+    return game.Inputs(jump=(i % 90 in (0, 20)),
+                       left=(i // 240) % 2 == 0,
+                       right=(i // 240) % 2 == 1)
+
+def bench_blits(counts=(100, 1000, 10000), frames=50):
+    """
+    Draws `count` objects (half platforms, half items on them) per frame, first
+    with one draw() call per object, then through a RenderQueue submitted with a
+    single Surface.blits call. Returns {count: (per-call us, queued us) per object}.
+    """
+    import pygame
+    import game
+    screen = game.init_app()
+    res = {}
+    for n in counts:
+        plats = stress_platforms(n // 2, 1)
+        items = game.ItemStore(plats)
+        for p in plats:
+            items.append(game.Item(p.x, p.y - 30, p))
+        t = time.perf_counter()
+        for _ in range(frames):
+            for p in plats:
+                p.draw(screen)
+            for it in items:
+                it.draw(screen)
+        per_call = (time.perf_counter() - t) * 1e6 / frames / n
+        queue = game.RenderQueue()
+        t = time.perf_counter()
+        for _ in range(frames):
+            queue.extend(plats.sprites())
+            queue.extend([it.sprite() for it in items])
+            queue.submit(screen)
+        res[n] = (per_call, (time.perf_counter() - t) * 1e6 / frames / n)
+    pygame.quit()
+    return res
+
+def bench_cull(counts=(100, 1000, 10000, 100000), per_screen=20, frames=50):
+    """
+    Builds worlds of `count` platforms stacked `per_screen` to a screen above the
+    view and times building the platform draw list for one view, for every
+    platform and with culling. Returns {count: (all ms, culled ms) per frame}.
+    """
+    import random
+    import pygame
+    import game
+    game.init_app()
+    res = {}
+    for n in counts:
+        plats = game.PlatformArray()
+        height = n / per_screen * game.HEIGHT
+        for _ in range(n):
+            plats.append(game.gen_platform(game.HEIGHT - random.uniform(0, height), 0))
+        plats.rebin()  # Bin the new platforms before timing.
+        times = []
+        for bottom in (None, game.HEIGHT):
+            t = time.perf_counter()
+            for _ in range(frames):
+                plats.sprites(0, bottom)
+            times.append((time.perf_counter() - t) * 1000 / frames)
+        res[n] = tuple(times)
+    pygame.quit()
+    return res
+
+def bench_worldgen(ticks=3000, climb=10):
+    """
+    Scrolls each level up `climb` pixels per step and times GameSimulation.generate,
+    with chunks made inline and by the background ChunkWorker (which gets a short
+    idle pause every step, like the frame wait of the real game).
+    Returns {(threaded, level): (mean us, p99 us, max us)}.
+    """
+    import game
+    res = {}
+    for threaded in (False, True):
+        for lvl in (1, 2, 3):
+            sim = game.GameSimulation(lvl, seed=2, threaded=threaded)
+            times = []
+            for _ in range(ticks):
+                sim.cam.y -= climb
+                time.sleep(0.0002)
+                t = time.perf_counter()
+                sim.generate()
+                times.append((time.perf_counter() - t) * 1e6)
+            sim.close()
+            times.sort()
+            res[(threaded, lvl)] = (statistics.mean(times), times[int(len(times) * 0.99)], times[-1])
+    return res
+
+def bench_levels(ticks=6000, seed=1, dirty=False):
+    """
+    Drives each level, built by init_game(lvl) through GameSimulation, for `ticks`
+    simulation ticks of scripted input. Each frame runs the ticks of one display
+    frame (SIM_RATE / FPS), draw_game and display.flip; when the player dies or
+    finishes the level it starts over with the same seed (not timed). With `dirty`
+    the frames are presented through game.DirtyRects.
+    Returns {"level1": {"sim": ticks/s, "render": frames/s, "frame": frames/s}, ...}
+    where sim times GameSimulation.step only, render times draw_game only and
+    frame times the whole frame.
+    """
+    import pygame
+    import game
+    screen = game.init_app()
+    hud = game.Hud(pygame.font.SysFont(None, 36))
+    per_frame = max(1, round(game.SIM_RATE / game.FPS))
+    clock = time.perf_counter
+    res = {}
+    for lvl in (1, 2, 3):
+        sim = game.GameSimulation(lvl, seed=seed)
+        rects = game.DirtyRects() if dirty else None
+        t_sim = t_draw = t_frame = 0.0
+        frames = ticks // per_frame
+        for f in range(frames):
+            t0 = clock()
+            for k in range(per_frame):
+                if sim.step(scripted_inputs(f * per_frame + k)) != game.RUNNING:
+                    break
+            t1 = clock()
+            areas = game.draw_game(screen, hud, sim, f / game.FPS, None, rects)
+            t2 = clock()
+            if rects:
+                rects.present(areas)
+            else:
+                pygame.display.flip()
+            t3 = clock()
+            t_sim += t1 - t0
+            t_draw += t2 - t1
+            t_frame += t3 - t0
+            if sim.status != game.RUNNING:
+                sim = game.GameSimulation(lvl, seed=seed)
+                if rects:
+                    rects.reset()
+        res[f"level{lvl}"] = {"sim": frames * per_frame / t_sim,
+                              "render": frames / t_draw,
+                              "frame": frames / t_frame}
+    pygame.quit()
+    return res
+
+def bench_profile(ticks=6000, seed=1, dirty=False):
+    """
+    Runs each level like bench_levels with a FrameProfiler attached.
+    Returns {level: (fps, busy p50 ms, busy p99 ms, {phase: mean ms})}.
+    """
+    import pygame
+    import game
+    screen = game.init_app()
+    hud = game.Hud(pygame.font.SysFont(None, 36))
+    per_frame = max(1, round(game.SIM_RATE / game.FPS))
+    res = {}
+    for lvl in (1, 2, 3):
+        prof = game.FrameProfiler(history=ticks)
+        sim = game.GameSimulation(lvl, seed=seed)
+        sim.prof = prof
+        rects = game.DirtyRects() if dirty else None
+        for f in range(ticks // per_frame):
+            prof.lap("events")
+            for k in range(per_frame):
+                if sim.step(scripted_inputs(f * per_frame + k)) != game.RUNNING:
+                    break
+            areas = game.draw_game(screen, hud, sim, f / game.FPS, prof, rects)
+            if rects:
+                rects.present(areas)
+            else:
+                pygame.display.flip()
+            prof.lap("flip")
+            prof.end_frame()
+            if sim.status != game.RUNNING:
+                sim = game.GameSimulation(lvl, seed=seed)
+                sim.prof = prof
+                prof.restart()
+                if rects:
+                    rects.reset()
+        res[lvl] = prof.stats()
+    pygame.quit()
+    return res
+
+def record_run(seed, ticks=180):
+    """
+    Plays a run headlessly with scripted inputs for `ticks` ticks of each
+    level, using the debug skip to leave levels 1 and 2 (the scripted player
+    would not reach their goals), so all three levels are played.
+    Returns (Replay of the run, highest level reached).
+    """
+    import game
+    replay = game.Replay(seed)
+    lvl = 1
+    sim = game.GameSimulation(lvl, replay.rate, seed)
+    i = 0
+    while not (lvl == 3 and sim.ticks == ticks):
+        inputs = scripted_inputs(i)
+        inputs.skip = lvl < 3 and sim.ticks == ticks
+        replay.record(inputs)
+        status = sim.step(inputs)
+        i += 1
+        if status == game.LEVEL_DONE and lvl < 3:
+            lvl += 1
+            sim = game.GameSimulation(lvl, replay.rate, seed)
+        elif status != game.RUNNING:
+            break
+    replay.digest = sim.digest()
+    return replay, lvl
+
+def check_determinism(seeds=range(5), ticks=180):
+    """
+    Checks that runs are reproducible: every recorded run must play back to
+    the same digest after a save/load round trip, and each level must end in
+    the same state with world generation in a background thread or inline
+    (played until game over, at most 10 * `ticks` ticks).
+    Returns a message for every mismatch.
+    """
+    import tempfile
+    import game
+    bad = []
+    path = os.path.join(tempfile.mkdtemp(), "check.pjr")
+    for seed in seeds:
+        replay, lvl = record_run(seed, ticks)
+        if lvl < 3:
+            bad.append(f"seed {seed}: the scripted run ended in level {lvl}")
+        replay.save(path)
+        played = game.play_replay(game.Replay.load(path))
+        if played.digest() != replay.digest:
+            bad.append(f"seed {seed}: replay diverged from the recording")
+        for lvl in (1, 2, 3):
+            digests = []
+            for threaded in (False, True):
+                sim = game.GameSimulation(lvl, seed=seed, threaded=threaded)
+                for i in range(10 * ticks):
+                    if sim.step(scripted_inputs(i)) != game.RUNNING:
+                        break
+                digests.append(sim.digest())
+                sim.close()
+            if digests[0] != digests[1]:
+                bad.append(f"seed {seed}, level {lvl}: threaded world generation diverged")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    return bad
+
+def check_baseline(res, base, tolerance):
+    """Returns a message for every result more than `tolerance` (a fraction) below its baseline."""
+    slow = []
+    for name, metrics in res.items():
+        for key, value in metrics.items():
+            ref = base.get(name, {}).get(key)
+            if ref and value < ref * (1 - tolerance):
+                slow.append(f"{name} {key}: {value:.0f}/s, baseline {ref:.0f}/s "
+                            f"({value / ref - 1:+.0%})")
+    return slow
+
+def main():
+    parser = argparse.ArgumentParser(description="Infinite Cat Jumper benchmarks")
+    parser.add_argument("bench", choices=["import", "assets", "memory", "motion", "rng", "orbit",
+                                          "blits", "cull", "worldgen", "collision", "collect",
+                                          "levels", "profile", "determinism"],
+                        help="benchmark to run")
+    parser.add_argument("--runs", type=int, default=10, help="number of repetitions")
+    parser.add_argument("--ticks", type=int, default=6000, help="simulation ticks per level")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (fraction)")
+    parser.add_argument("--dirty", action="store_true",
+                        help="present frames with dirty rectangles (levels, profile)")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    if args.bench == "import":
+        res = bench_import(args.runs)
+        print(f"import game: {res['total_ms']:.1f} ms "
+              f"(pygame excluded: {res['game_only_ms']:.1f} ms), median of {args.runs}")
+    elif args.bench == "assets":
+        for cold, warm in bench_assets():
+            print(f"{cold:<32} then {warm}")
+    elif args.bench == "memory":
+        for name, mib in bench_memory().items():
+            print(f"100k {name}: {mib:.1f} MiB")
+        for name, (plain, slots) in bench_attrs().items():
+            print(f"{name} attribute access: {plain:.0f} ns with __dict__, "
+                  f"{slots:.0f} ns with __slots__ per iteration")
+    elif args.bench == "motion":
+        for (lvl, n), ms in bench_motion().items():
+            print(f"level {lvl} motion, {n:>6} platforms: {ms:.3f} ms/tick "
+                  f"({ms / FRAME_MS:.1%} of a 60 FPS frame)")
+    elif args.bench == "rng":
+        for (lvl, n), (direct, buffered) in bench_rng().items():
+            print(f"level {lvl} motion, {n:>5} platforms: Generator {direct:.1f} us, "
+                  f"RandomBuffer {buffered:.1f} us per tick")
+    elif args.bench == "orbit":
+        for n, (per_object, trig, rec) in bench_orbit().items():
+            print(f"level 3 orbit, {n:>6} platforms: per-object trig {per_object:.3f} ms, "
+                  f"vectorized trig {trig:.3f} ms, recurrence {rec:.3f} ms per tick")
+    elif args.bench == "blits":
+        for n, (per_call, queued) in bench_blits().items():
+            print(f"draw {n:>6} objects: {per_call:.2f} us/object one by one, "
+                  f"{queued:.2f} us/object batched ({1 - queued / per_call:.0%} less)")
+    elif args.bench == "cull":
+        for n, (full, culled) in bench_cull().items():
+            print(f"draw list, {n:>6} platforms: {full:.3f} ms all, {culled:.3f} ms culled")
+    elif args.bench == "worldgen":
+        for (threaded, lvl), (mean, p99, worst) in bench_worldgen().items():
+            print(f"level {lvl} generate, {'thread' if threaded else 'inline'}: "
+                  f"mean {mean:.1f} us, p99 {p99:.1f} us, max {worst:.0f} us")
+    elif args.bench == "collision":
+        for n, us in bench_collision().items():
+            print(f"Player.update, {n:>6} platforms: {us:.1f} us/tick")
+    elif args.bench == "collect":
+        for n, us in bench_collect().items():
+            print(f"Player.collect, {n:>6} items: {us:.1f} us/tick")
+    elif args.bench == "profile":
+        for lvl, (fps, p50, p99, phases) in bench_profile(args.ticks, dirty=args.dirty).items():
+            print(f"level {lvl}: {fps:.0f} frames/s, busy p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+            for phase, ms in phases.items():
+                if ms:
+                    print(f"    {phase:<9} {ms:.3f} ms")
+    elif args.bench == "determinism":
+        bad = check_determinism(range(args.runs))
+        for msg in bad:
+            print("MISMATCH:", msg)
+        if bad:
+            sys.exit(1)
+        print(f"Replays and threaded generation match over {args.runs} seeds")
+    elif args.bench == "levels":
+        res = bench_levels(args.ticks, dirty=args.dirty)
+        for name, m in res.items():
+            print(f"{name}: sim {m['sim']:.0f} ticks/s, render {m['render']:.0f} frames/s, "
+                  f"full frame {m['frame']:.0f} frames/s")
+        if args.save:
+            with open(args.baseline, "w") as f:
+                json.dump(res, f, indent=2, sort_keys=True)
+                f.write("\n")
+            print(f"Saved baseline to {args.baseline}")
+        elif os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                slow = check_baseline(res, json.load(f), args.tolerance)
+            for msg in slow:
+                print("REGRESSION:", msg)
+            if slow:
+                sys.exit(1)
+            print("No regressions against", os.path.basename(args.baseline))
+
+if __name__ == "__main__":
+    main()
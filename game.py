@@ -9,19 +9,18 @@ Version: 04.02.2025
 # random: for generating random numbers (used in platform/item generation).
 # math: for mathematical operations (used in platform rotation in level 3).
 # sys: for system-specific functions (exiting the program).
-import pygame, random, math, sys
-
-# Initialize all imported pygame modules (graphics, events, etc.)
-pygame.init()
-# Initialize the mixer module for handling sound effects
-pygame.mixer.init()
+# struct, zlib: for the binary replay files and state checksums.
+# argparse: for the command line options.
+# time, collections: for the frame profiler.
+# os, hashlib: for the prescaled image cache.
+# threading, queue: for generating the world in the background.
+# numpy: for storing platforms in arrays and moving them all at once.
+import pygame, random, math, sys, struct, zlib, argparse, time, collections, os, hashlib
+import threading, queue
+import numpy as np
 
 # Define constants for the game window dimensions.
 WIDTH, HEIGHT = 800, 600
-# Set up the display with the specified width and height.
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-# Set the window title.
-pygame.display.set_caption("Infinite Cat Jumper")
 
 # Define commonly used colors as RGB tuples.
 WHITE   = (255, 255, 255)
@@ -38,56 +37,229 @@ RAINBOW = [
     (75, 0, 130),
     (148, 0, 211)
 ]
+ITEM_BORDER = 2   # Width of the rainbow border drawn around special items.
+
+# Define physics-related constants, in seconds and pixels per second
+# (Physics converts them to per-step values for the simulation rate):
+GRAV     = 1800  # Gravity force applied to the player normally.
+EASYGRAV = 720   # Reduced gravity for the very first jump (to ease initial movement).
+JUMP     = 900   # Initial jump velocity.
+DJUMP    = 720   # Double jump velocity.
+MOVE     = 300   # Horizontal speed of the player.
+INVUL    = 0.5   # Invulnerability after being hit.
+PLAT_SPEEDS = [-180, -120, -60, 60, 120, 180]  # Platform speeds in levels 1 and 2.
+ROT_SPEEDS  = (0.6, 3.0)         # Range of level 3 rotation speeds (radians per second).
+TURN_CHANCE = 1 - 0.99 ** 60     # Chance per second that a platform picks a new direction.
 
-# Define physics-related constants:
-GRAV     = 0.5   # Gravity force applied to the player normally.
-EASYGRAV = 0.2   # Reduced gravity for the very first jump (to ease initial movement).
-JUMP     = 15    # Initial jump velocity.
-DJUMP    = 12    # Double jump velocity.
+# Simulation and display rates, chosen independently of each other.
+SIM_RATE    = 120   # Simulation steps per second.
+FPS         = 60    # Frames drawn per second.
+MAX_CATCHUP = 8     # Most simulation steps run for one frame after a hitch.
+
+# World generation: the world is kept generated LOOKAHEAD pixels above the top of
+# the screen, CHUNK platforms at a time and at most GEN_CHUNKS chunks per step
+# (a fixed amount of work per step, so generation never depends on timing).
+LOOKAHEAD  = HEIGHT
+CHUNK      = 4
+GEN_CHUNKS = 2
+QUEUE_CHUNKS = 8    # Chunks the background generator may prepare ahead.
 
 # Level goals and placeholders for level scores:
 level_goals  = [10, 15, 25]         # Score goals needed to complete levels 1, 2, and 3.
 level_scores = [None, None, None]    # To store scores achieved in each level.
 
-# Load images and sounds with error handling:
-try:
-    # Attempt to load the cat image from file and scale it to 50x50 pixels.
-    cat_img = pygame.image.load('cat.png')
-    cat_img = pygame.transform.scale(cat_img, (50, 50))
-except:
-    # Fallback: create a plain white surface if the image fails to load.
-    cat_img = pygame.Surface((50, 50))
-    cat_img.fill(WHITE)
-
-try:
-    # Attempt to load the item image from file and scale it to 30x30 pixels.
-    item_img = pygame.image.load('obtainable.png')
-    item_img = pygame.transform.scale(item_img, (30, 30))
-except:
-    # Fallback: create a plain green surface if the image fails to load.
-    item_img = pygame.Surface((30, 30))
-    item_img.fill(GREEN)
-
-try:
-    # Attempt to load a sound effect for item collection.
-    collect_sound = pygame.mixer.Sound('sound_affect.mp3')
-except:
-    # Fallback: if the sound fails to load, use None.
-    collect_sound = None
+# The window and assets are created by init_app(), not at import time, so
+# importing this module (e.g. for Platform, gen_platform or save_score) does no I/O.
+screen        = None   # The display surface.
+cat_img       = None   # The player's image.
+item_img      = None   # The collectible item's image.
+collect_sound = None   # Sound played when an item is collected (None if unavailable).
+sprites       = None   # SpriteCache of the pre-rendered platforms and special items.
+
+# Folder where the scaled images are cached between runs.
+CACHE_DIR = ".asset_cache"
+
+# Assets class: Loads the game's images and sounds and times every load.
+# Images are converted to the display's pixel format so blitting them needs no
+# conversion, and their scaled versions are cached on disk (keyed by a hash of
+# the source file and the target size), so a big source image is only decoded
+# and scaled the first time the game starts.
+class Assets:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir  # Folder of the prescaled images.
+        self.times = {}             # Path -> (load time in ms, how it was loaded).
+
+    def image(self, path, size, fallback):
+        """
+        Returns the image at `path` scaled to `size` in the display format,
+        or a plain surface of color `fallback` if it can't be loaded.
+        """
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                key = hashlib.sha1(f.read()).hexdigest()[:16]
+            cached = os.path.join(self.cache_dir, f"{key}-{size[0]}x{size[1]}.png")
+            try:
+                img = pygame.image.load(cached)
+                how = "cached"
+            except (OSError, pygame.error):
+                # Not cached yet (or unreadable): scale the source and store the result.
+                img = pygame.transform.scale(pygame.image.load(path), size)
+                how = "scaled"
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    pygame.image.save(img, cached)
+                except (OSError, pygame.error):
+                    pass  # The cache is only an optimization.
+        except (OSError, pygame.error):
+            img = pygame.Surface(size)
+            img.fill(fallback)
+            how = "missing"
+        # Convert to the display format, keeping per-pixel transparency if there is any.
+        img = img.convert_alpha() if img.get_flags() & pygame.SRCALPHA else img.convert()
+        self.times[path] = ((time.perf_counter() - start) * 1000, how)
+        return img
+
+    def sound(self, path):
+        """Returns the sound at `path`, or None if it can't be loaded."""
+        start = time.perf_counter()
+        try:
+            snd = pygame.mixer.Sound(path)
+            how = "loaded"
+        except (OSError, pygame.error):
+            snd = None
+            how = "missing"
+        self.times[path] = ((time.perf_counter() - start) * 1000, how)
+        return snd
+
+    def report(self):
+        """Returns one line per asset with its load time."""
+        return [f"{path}: {ms:.1f} ms ({how})" for path, (ms, how) in self.times.items()]
+
+# SpriteCache class: Pre-rendered platform and special item sprites, so drawing
+# them is a single blit instead of rasterizing rectangles every frame.
+# The sprites live in a bounded LRU cache keyed by size and variant.
+class SpriteCache:
+    def __init__(self, item, size=256):
+        self.item = item    # The item image the rainbow variants are built from.
+        self.size = size    # Most sprites kept at once.
+        self.cache = collections.OrderedDict()  # Key -> sprite, least recently used first.
+
+    def get(self, key):
+        """Returns the sprite for `key`, rendering it (and evicting the oldest) if needed."""
+        spr = self.cache.get(key)
+        if spr is None:
+            spr = self.render(key)
+            self.cache[key] = spr
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return spr
+
+    def render(self, key):
+        """Renders a ("plat", w, h, hazard) platform or an ("item", color index) special item."""
+        if key[0] == "plat":
+            _, w, h, hazard = key
+            spr = pygame.Surface((w, h)).convert()
+            spr.fill(RED if hazard else GREEN)
+        else:
+            # The item image inside a rainbow-colored border.
+            b = ITEM_BORDER
+            w, h = self.item.get_size()
+            spr = pygame.Surface((w + 2 * b, h + 2 * b)).convert()
+            pygame.draw.rect(spr, RAINBOW[key[1]], spr.get_rect(), b)
+            spr.blit(self.item, (b, b))
+        return spr
+
+    def platform(self, w, h, hazard):
+        """Returns the sprite of a `w` x `h` platform."""
+        return self.get(("plat", int(w), int(h), hazard))
+
+    def special(self, idx):
+        """Returns the special item sprite with the border in RAINBOW[idx]."""
+        return self.get(("item", idx))
+
+    def warm(self, plats=()):
+        """
+        Renders every platform size gen_platform makes, every special item and
+        the sprites of the given platforms (e.g. a new level's) ahead of time.
+        """
+        for w in range(50, 121):
+            for hazard in (False, True):
+                self.platform(w, 20, hazard)
+        for p in plats:
+            self.platform(p.w, p.h, p.hazard)
+        for idx in range(len(RAINBOW)):
+            self.special(idx)
+
+def init_app(load_times=False):
+    """
+    Initializes pygame, opens the game window and loads the images and sounds.
+    Must be called once before anything is drawn. With `load_times`, prints how
+    long every asset took to load.
+    """
+    global screen, cat_img, item_img, collect_sound, sprites
+    # Initialize all imported pygame modules (graphics, events, etc.)
+    pygame.init()
+    # Initialize the mixer module for handling sound effects
+    pygame.mixer.init()
+    # Set up the display with the specified width and height.
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    # Set the window title.
+    pygame.display.set_caption("Infinite Cat Jumper")
+
+    # Load images and sounds (missing files fall back to plain surfaces / no sound):
+    assets = Assets()
+    # The cat image scaled to 50x50 pixels (plain white if missing).
+    cat_img = assets.image('cat.png', (50, 50), WHITE)
+    # The item image scaled to 30x30 pixels (plain green if missing).
+    item_img = assets.image('obtainable.png', (30, 30), GREEN)
+    # Sound effect for item collection.
+    collect_sound = assets.sound('sound_affect.mp3')
+    # Pre-render the platform and special item sprites.
+    sprites = SpriteCache(item_img)
+    sprites.warm()
+    if load_times:
+        for line in assets.report():
+            print(line)
+    return screen
 
 # =====================
 # Class Definitions
 # =====================
 
+# Physics class: The physics constants converted to per-step values for a given
+# simulation rate, so the game plays the same whatever the rate is.
+class Physics:
+    def __init__(self, rate=SIM_RATE):
+        self.rate = rate                       # Simulation steps per second.
+        self.dt = dt = 1.0 / rate              # Length of one step in seconds.
+        self.grav = GRAV * dt * dt             # Gravity (pixels/step²).
+        self.easygrav = EASYGRAV * dt * dt     # Gravity before the first jump (pixels/step²).
+        self.jump = JUMP * dt                  # Jump velocity (pixels/step).
+        self.djump = DJUMP * dt                # Double jump velocity (pixels/step).
+        self.move = MOVE * dt                  # Player speed (pixels/step).
+        self.invul = round(INVUL * rate)       # Invulnerability (steps).
+        self.speeds = [s * dt for s in PLAT_SPEEDS]        # Platform speeds (pixels/step).
+        self.rot = (ROT_SPEEDS[0] * dt, ROT_SPEEDS[1] * dt)  # Rotation speeds (radians/step).
+        self.turn = 1 - (1 - TURN_CHANCE) ** dt  # Chance per step to change direction.
+
 # Player class: Manages the cat character controlled by the user.
 class Player:
-    def __init__(self, x, y):
+    # Fixed attribute layout (no per-instance __dict__), so every Player takes less memory.
+    __slots__ = ("phys", "x", "y", "w", "h", "vy", "jumps", "score", "lives", "initial",
+                 "alive", "double_end", "invul", "hit_recently", "start_x", "start_y")
+
+    def __init__(self, x, y, phys=None):
+        # Per-step physics constants for the simulation rate.
+        self.phys = phys or Physics()
         # Initialize player's position, size, and movement properties.
         self.x = x                 # Horizontal position.
         self.y = y                 # Vertical position.
         self.w = 50                # Width of the player's hitbox.
         self.h = 50                # Height of the player's hitbox.
-        self.vy = 0                # Vertical velocity.
+        self.vy = 0                # Vertical velocity (pixels/step).
         self.jumps = 0             # Number of jumps performed (to limit double jumps).
         self.score = 0             # Player's score (items collected).
         self.lives = 3             # Number of lives the player has.
@@ -95,7 +267,7 @@ class Player:
         self.alive = True          # Player state: alive or dead.
         self.double_end = 0        # Timer for double score effect expiration.
         
-        # Timer (in frames) for temporary invulnerability after being hit.
+        # Timer (in steps) for temporary invulnerability after being hit.
         self.invul = 0
         # Flag to prevent multiple damage registrations while in contact with a hazard.
         self.hit_recently = False
@@ -112,7 +284,7 @@ class Player:
             self.alive = False
         else:
             # If lives remain, provide a short invulnerability period.
-            self.invul = 30  # About half a second at 60 FPS.
+            self.invul = self.phys.invul  # Half a second.
             # Reset the player's position to the starting point.
             self.x = self.start_x
             self.y = self.start_y
@@ -123,7 +295,7 @@ class Player:
     def update(self, plats):
         # Apply gravity based on whether it’s the very first jump.
         # Use EASYGRAV (less gravity) if the player hasn't jumped yet.
-        g = EASYGRAV if (self.initial and self.jumps == 0) else GRAV
+        g = self.phys.easygrav if (self.initial and self.jumps == 0) else self.phys.grav
         
         # Apply a slightly reduced gravity if the player is moving upward.
         if self.vy < 0:
@@ -138,9 +310,10 @@ class Player:
             self.invul -= 1
         
         # Check for collisions with hazardous platforms (only if not invulnerable).
+        # The broadphase grid only returns platforms vertically close to the player.
         collision = False
         if self.invul == 0:
-            for p in plats:
+            for p in plats.near(self.x, self.y, self.x + self.w, self.y + self.h):
                 # Check rectangular overlap between player and platform.
                 if (self.x + self.w > p.x and self.x < p.x + p.w and
                     self.y + self.h > p.y and self.y < p.y + p.h and p.hazard):
@@ -157,7 +330,7 @@ class Player:
 
         # Check for safe landing on non-hazard platforms (only when falling).
         if self.alive and self.vy >= 0:
-            for p in plats:
+            for p in plats.near(self.x, self.y + self.h, self.x + self.w, self.y + self.h):
                 # Check if player's bottom edge is within platform bounds.
                 if (not p.hazard and
                     self.y + self.h >= p.y and self.y + self.h <= p.y + p.h and
@@ -178,33 +351,41 @@ class Player:
     def jump(self):
         # Allow jump or double jump based on the current jump count.
         if self.jumps == 0:
-            self.vy = -JUMP  # Set upward velocity for the first jump.
+            self.vy = -self.phys.jump  # Set upward velocity for the first jump.
             self.jumps = 1   # Increment jump count.
             self.initial = False  # No longer in the initial state.
         elif self.jumps == 1:
-            self.vy = -DJUMP  # Set upward velocity for the double jump.
+            self.vy = -self.phys.djump  # Set upward velocity for the double jump.
             self.jumps = 2    # Increment jump count to indicate double jump used.
 
     def move_left(self):
         # Move player left by subtracting a fixed speed.
-        self.x -= 5
+        self.x -= self.phys.move
 
     def move_right(self):
         # Move player right by adding a fixed speed.
-        self.x += 5
-
-    def draw(self, surf):
-        # Draw the player's image on the provided surface at the player's coordinates.
-        surf.blit(cat_img, (self.x, self.y))
-
-    def collect(self, items):
-        # Get the current time in milliseconds.
-        now = pygame.time.get_ticks()
-        # Loop over a copy of the items list (to allow removal while iterating).
-        for it in items[:]:
-            # Check for collision between player and item using rectangular boundaries.
-            if (self.x < it.get_x() + it.w and self.x + self.w > it.get_x() and
-                self.y < it.get_y() + it.h and self.y + self.h > it.get_y()):
+        self.x += self.phys.move
+
+    def sprite(self, top=0):
+        # The player's image and its screen position (`top` is the camera's world y).
+        return cat_img, (self.x, self.y - top)
+
+    def draw(self, surf, top=0):
+        # Draw the player's image and return the area drawn.
+        return surf.blit(*self.sprite(top))
+
+    def collect(self, items, now):
+        """Collect every item touching the player.
+           `now` is the simulation time in milliseconds (used for the double score timer).
+           Returns the number of items collected."""
+        got = 0
+        # Only look at the items near the player (near() returns a new list,
+        # so items can be removed while iterating).
+        for it in items.near(self.x, self.y, self.x + self.w, self.y + self.h):
+            # Check for a rectangular overlap (item positions are kept current by ItemStore.place()).
+            ix, iy = it.x, it.y
+            if (self.x < ix + it.w and self.x + self.w > ix and
+                self.y < iy + it.h and self.y + self.h > iy):
                 # If the item is marked as special, set the double score timer.
                 if it.special:
                     self.double_end = now + 5000  # 5 seconds of double score.
@@ -213,43 +394,368 @@ class Player:
                     self.score += 2
                 else:
                     self.score += 1
-                # Remove the collected item from the list.
+                # Remove the collected item from the store (O(1)).
                 items.remove(it)
-                # Play a sound effect if one is loaded.
-                if collect_sound:
-                    collect_sound.play()
+                got += 1
+        return got
+
+# PlatformArray class: Stores every platform of a level as contiguous NumPy arrays
+# (struct of arrays) so the per-tick level motions run as vectorized kernels.
+# It also keeps a broadphase grid: rows are bucketed by the CELL x CELL square
+# their top-left corner is in, so collision queries only look at platforms
+# near the player.
+class PlatformArray:
+    # Names of the float columns. cos_a/sin_a are the cosine and sine of `angle`
+    # and cos_r/sin_r those of `rot_speed`, kept up to date by orbit_step().
+    FIELDS = ("x", "y", "w", "h", "vx", "vy", "angle", "radius",
+              "cx", "cy", "rot_speed", "slide", "cos_a", "sin_a", "cos_r", "sin_r")
+    # Names of the bool columns; `synced` is set when the cos/sin columns match the angles.
+    BOOLS  = ("hazard", "synced")
+    RESYNC = 240                         # Steps between exact recomputations of cos/sin.
+    CELL   = 64                          # Size of a grid cell in pixels.
+    COLS   = 4096                        # Cell columns per grid row (x is clamped into range).
+    NOCELL = np.iinfo(np.int64).min      # Cell value of rows not yet in the grid.
+
+    def __init__(self, capacity=64):
+        self.n = 0         # Number of platforms currently stored.
+        self.views = []    # Platform view for each row, in row order.
+        for f in self.FIELDS:
+            setattr(self, f, np.zeros(capacity))
+        for f in self.BOOLS:
+            setattr(self, f, np.zeros(capacity, dtype=bool))
+        self.orbit_ticks = 0   # Steps run by orbit_step().
+        # Broadphase grid: cell index -> set of rows; `cell[i]` is the bucket row i is in.
+        self.cell = np.full(capacity, self.NOCELL, dtype=np.int64)
+        self.buckets = {}
+        self.max_w = 0.0    # Widest platform, to widen queries by.
+        self.max_h = 0.0    # Tallest platform, to widen queries by.
+        self.stale = False  # True when positions changed since the last rebin().
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __getitem__(self, i):
+        # Supports both indexing and slicing, like the list of platforms it replaces.
+        return self.views[i]
+
+    def __contains__(self, p):
+        # A platform view belongs to exactly one store, so membership is O(1).
+        return p._s is self
+
+    def _grow(self):
+        """Doubles the capacity of every column."""
+        cap = 2 * len(self.x)
+        for f in self.FIELDS + self.BOOLS + ("cell",):
+            old = getattr(self, f)
+            new = np.full(cap, self.NOCELL if f == "cell" else 0, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, f, new)
+
+    def _push(self, view):
+        """Reserves a new, all-zero row for `view` and returns its index."""
+        if self.n == len(self.x):
+            self._grow()
+        i = self.n
+        self.n += 1
+        # A row freed by remove() still holds the old platform's values.
+        for f in self.FIELDS + self.BOOLS:
+            getattr(self, f)[i] = 0
+        self.views.append(view)
+        view._s = self
+        view._i = i
+        self.stale = True   # The new row is binned on the next query.
+        return i
+
+    def _copy_row(self, src, i, j):
+        """Copies row `i` of store `src` into row `j` of this store."""
+        for f in self.FIELDS + self.BOOLS:
+            getattr(self, f)[j] = getattr(src, f)[i]
+
+    def add(self, x, y, w, h=20):
+        """Creates a new platform in this store and returns its view."""
+        return Platform(x, y, w, h, store=self)
+
+    def append(self, p):
+        """Moves platform `p` (e.g. one made by gen_platform) into this store."""
+        if p._s is self:
+            return
+        src, i = p._s, p._i
+        self._copy_row(src, i, self._push(p))
+
+    def _detach(self, p):
+        """Gives a removed platform its own one-row store so the view stays usable."""
+        own = PlatformArray(1)
+        own._copy_row(self, p._i, 0)
+        own.n = 1
+        own.views.append(p)
+        p._s = own
+        p._i = 0
+
+    def remove(self, p):
+        """Removes platform `p` in O(1) by moving the last row into its slot."""
+        i, last = p._i, self.n - 1
+        self._detach(p)
+        self._unbin(i)
+        if i != last:
+            self._copy_row(self, last, i)
+            moved = self.views[last]
+            moved._i = i
+            self.views[i] = moved
+            # The moved row keeps its cell under its new index.
+            c = self.cell[last]
+            self._unbin(last)
+            if c != self.NOCELL:
+                self.buckets.setdefault(int(c), set()).add(i)
+                self.cell[i] = c
+        self.views.pop()
+        self.n -= 1
+
+    def below(self, y):
+        """Returns the platforms whose top edge is at or below `y`, last row first."""
+        rows = np.flatnonzero(self.y[:self.n] >= y)
+        views = self.views
+        return [views[i] for i in rows[::-1].tolist()]
+
+    # ----- Broadphase grid -----
+
+    def _unbin(self, i):
+        """Removes row `i` from its grid cell."""
+        c = self.cell[i]
+        if c != self.NOCELL:
+            c = int(c)
+            bucket = self.buckets[c]
+            bucket.discard(i)
+            if not bucket:
+                del self.buckets[c]
+            self.cell[i] = self.NOCELL
+
+    def _key(self, row, col):
+        """Combines a cell row and column into one grid key."""
+        return row * self.COLS + col
+
+    def rebin(self):
+        """Moves the rows whose corner crossed into another cell; all others are untouched."""
+        n = self.n
+        half = self.COLS // 2
+        rows = np.floor(self.y[:n] / self.CELL).astype(np.int64)
+        cols = np.floor(self.x[:n] / self.CELL).astype(np.int64)
+        new = self._key(rows, np.clip(cols, -half, half - 1))
+        changed = np.flatnonzero(new != self.cell[:n])
+        for i in changed.tolist():
+            self._unbin(i)
+            self.buckets.setdefault(int(new[i]), set()).add(i)
+        self.cell[:n] = new
+        self.max_w = self.w[:n].max() if n else 0.0
+        self.max_h = self.h[:n].max() if n else 0.0
+        self.stale = False
+
+    def near(self, x0, y0, x1, y1):
+        """
+        Returns the platforms (in row order) that may overlap the rectangle
+        (x0, y0)-(x1, y1), i.e. every platform whose top-left corner lies
+        between (x0 - max_w, y0 - max_h) and (x1, y1).
+        """
+        views = self.views
+        return [views[i] for i in self.near_rows(x0, y0, x1, y1)]
+
+    def near_rows(self, x0, y0, x1, y1):
+        """Like near(), but returns the sorted row indices instead of the platforms."""
+        if self.stale:
+            self.rebin()
+        half = self.COLS // 2
+        r0 = math.floor((y0 - self.max_h) / self.CELL)
+        r1 = math.floor(y1 / self.CELL)
+        c0 = max(math.floor((x0 - self.max_w) / self.CELL), -half)
+        c1 = min(math.floor(x1 / self.CELL), half - 1)
+        buckets = self.buckets
+        rows = []
+        for r in range(r0, r1 + 1):
+            for c in range(self._key(r, c0), self._key(r, c1) + 1):
+                bucket = buckets.get(c)
+                if bucket:
+                    rows.extend(bucket)
+        if len(rows) > 1:
+            rows.sort()
+        return rows
+
+    # ----- Motion kernels (one per level) -----
+
+    def slide_step(self, phys, rng):
+        """
+        Level 1: platforms slide horizontally and bounce off the screen edges.
+        `rng` is the source of motion randomness (a NumPy Generator or a RandomBuffer).
+        """
+        n = self.n
+        x, w, s = self.x[:n], self.w[:n], self.slide[:n]
+        # Give platforms without a direction yet (slide == 0) a random one.
+        unset = s == 0
+        if unset.any():
+            s[unset] = rng.choice(phys.speeds, unset.sum())
+        x += s
+        # Each platform has a small chance to pick a new direction.
+        change = rng.random(n) < phys.turn
+        if change.any():
+            s[change] = rng.choice(phys.speeds, change.sum())
+        # Keep platforms on the screen, bouncing them off the edges.
+        lo = x < 0
+        x[lo] = 0
+        s[lo] = np.abs(s[lo])
+        hi = x + w > WIDTH
+        x[hi] = WIDTH - w[hi]
+        s[hi] = -np.abs(s[hi])
+        self.stale = True
+
+    def bounce_step(self, phys, rng, top=0):
+        """
+        Level 2: platforms move horizontally and vertically, bouncing off the screen edges.
+        `rng` is the source of motion randomness (a NumPy Generator or a
+        RandomBuffer) and `top` is the world y-coordinate at the top of the screen.
+        """
+        n = self.n
+        x, y, w, h = self.x[:n], self.y[:n], self.w[:n], self.h[:n]
+        vx, vy = self.vx[:n], self.vy[:n]
+        x += vx
+        y += vy
+        # Each velocity component has a small chance to change.
+        change = rng.random(n) < phys.turn
+        if change.any():
+            vx[change] = rng.choice(phys.speeds, change.sum())
+        change = rng.random(n) < phys.turn
+        if change.any():
+            vy[change] = rng.choice(phys.speeds, change.sum())
+        vx[(x < 0) | (x + w > WIDTH)] *= -1
+        vy[(y < top) | (y + h > top + HEIGHT)] *= -1
+        self.stale = True
+
+    def orbit_step(self):
+        """
+        Level 3: platforms follow a circular path around (cx, cy).
+        Instead of calling cos/sin for every platform every step, each platform's
+        (cos, sin) pair is turned by its rotation speed with a rotation-matrix
+        recurrence. New or changed platforms, and every platform each RESYNC
+        steps, get the pair recomputed from the angle, so rounding errors can't
+        build up (which also keeps the pair normalized).
+        """
+        n = self.n
+        self.orbit_ticks += 1
+        synced = self.synced[:n]
+        if self.orbit_ticks % self.RESYNC == 0:
+            synced[:] = False
+        if not synced.all():
+            todo = np.flatnonzero(~synced)
+            angle, rot = self.angle[todo], self.rot_speed[todo]
+            self.cos_a[todo], self.sin_a[todo] = np.cos(angle), np.sin(angle)
+            self.cos_r[todo], self.sin_r[todo] = np.cos(rot), np.sin(rot)
+            synced[todo] = True
+        ca, sa, radius = self.cos_a[:n], self.sin_a[:n], self.radius[:n]
+        self.x[:n] = self.cx[:n] + radius * ca - self.w[:n] / 2
+        self.y[:n] = self.cy[:n] + radius * sa - self.h[:n] / 2
+        # Turn every pair by its rotation speed: (c, s) -> (c*cr - s*sr, s*cr + c*sr).
+        cr, sr = self.cos_r[:n], self.sin_r[:n]
+        c = ca * cr - sa * sr
+        sa *= cr
+        sa += ca * sr
+        ca[:] = c
+        self.angle[:n] += self.rot_speed[:n]
+        self.stale = True
+
+    def sprites(self, top=0, bottom=None):
+        """
+        Returns the (sprite, screen position) pair of every platform, built
+        straight from the columns (`top` is the camera's world y). With `bottom`,
+        only the platforms that may be visible between `top` and `bottom` are
+        included (found through the grid, so the cost follows what is on screen).
+        """
+        if bottom is None:
+            rows = slice(0, self.n)
+        else:
+            rows = np.array(self.near_rows(0, top, WIDTH, bottom), dtype=np.intp)
+        sprite = sprites.platform
+        return list(zip(map(sprite, self.w[rows].tolist(), self.h[rows].tolist(), self.hazard[rows].tolist()),
+                        zip(self.x[rows].tolist(), (self.y[rows] - top).tolist())))
+
+def _column(name, orbit=False):
+    """
+    Builds a property that reads/writes one column of the platform's store.
+    Setting an `orbit` column (angle, rotation speed) makes orbit_step() recompute
+    the platform's cos/sin pair.
+    """
+    def get(self):
+        return getattr(self._s, name)[self._i].item()
+    def set(self, value):
+        getattr(self._s, name)[self._i] = value
+        self._s.stale = True   # The platform may have changed grid cell.
+        if orbit:
+            self._s.synced[self._i] = False
+    return property(get, set)
 
 # Platform class: Represents a platform that the player can jump on.
+# The data lives in a PlatformArray; a Platform is a thin view of one row.
 class Platform:
-    def __init__(self, x, y, w, h=20):
-        self.x = x     # Horizontal position.
-        self.y = y     # Vertical position.
-        self.w = w     # Width of the platform.
-        self.h = h     # Height of the platform (default is 20 pixels).
-        self.hazard = False  # Flag indicating if the platform is hazardous.
-        self.slide = None    # For horizontal sliding movement.
-        self.vx = 0          # Horizontal velocity (used in level 2).
-        self.vy = 0          # Vertical velocity (used in level 2).
-        self.radius = 0      # Radius for circular motion (used in level 3).
-        self.angle = 0       # Angle for circular motion (used in level 3).
-        self.rot_speed = 0   # Rotation speed for circular motion (used in level 3).
-        self.cx = 0          # Center x-coordinate for circular motion.
-        self.cy = 0          # Center y-coordinate for circular motion.
-
-    def draw(self, surf):
-        # Choose the platform color based on whether it is hazardous.
-        color = RED if self.hazard else GREEN
-        # Draw the platform as a rectangle.
-        pygame.draw.rect(surf, color, (self.x, self.y, self.w, self.h))
+    # A view only holds its store and row; every other attribute is a column property.
+    __slots__ = ("_s", "_i")
+
+    def __init__(self, x, y, w, h=20, store=None):
+        # Platforms created on their own get a private one-row store until
+        # they are appended to a level's PlatformArray.
+        if store is None:
+            store = PlatformArray(1)
+        i = store._push(self)
+        store.x[i] = x       # Horizontal position.
+        store.y[i] = y       # Vertical position.
+        store.w[i] = w       # Width of the platform.
+        store.h[i] = h       # Height of the platform (default is 20 pixels).
+        # All other columns start at zero: not hazardous, no slide direction,
+        # no velocity (level 2) and no circular motion (level 3).
+
+    x         = _column("x")
+    y         = _column("y")
+    w         = _column("w")
+    h         = _column("h")
+    hazard    = _column("hazard")     # Flag indicating if the platform is hazardous.
+    vx        = _column("vx")         # Horizontal velocity (used in level 2).
+    vy        = _column("vy")         # Vertical velocity (used in level 2).
+    radius    = _column("radius")     # Radius for circular motion (used in level 3).
+    angle     = _column("angle", orbit=True)      # Angle for circular motion (used in level 3).
+    rot_speed = _column("rot_speed", orbit=True)  # Rotation speed for circular motion (used in level 3).
+    cx        = _column("cx")         # Center x-coordinate for circular motion.
+    cy        = _column("cy")         # Center y-coordinate for circular motion.
+
+    @property
+    def slide(self):
+        # Horizontal sliding speed (level 1, pixels/step); None until a direction is chosen.
+        s = self._s.slide[self._i].item()
+        return s if s else None
+
+    @slide.setter
+    def slide(self, value):
+        self._s.slide[self._i] = value or 0
+
+    def sprite(self, top=0):
+        # The pre-rendered platform (red if hazardous, green otherwise) and its
+        # screen position (`top` is the camera's world y).
+        return sprites.platform(self.w, self.h, self.hazard), (self.x, self.y - top)
+
+    def draw(self, surf, top=0):
+        # Blit the platform and return the area drawn.
+        return surf.blit(*self.sprite(top))
 
 # Item class: Represents a collectible item that may appear on a platform.
 class Item:
+    # Items are small and numerous, so they use slots instead of a __dict__.
+    __slots__ = ("plat", "ox", "oy", "x", "y", "w", "h", "special", "slot")
+
     def __init__(self, x, y, plat=None):
         self.plat = plat  # Reference to the platform the item is attached to (if any).
         if plat:
-            # If attached to a platform, store the offset relative to the platform.
+            # If attached to a platform, store the offset relative to the platform
+            # and work out the position from it (ItemStore.place() keeps it current).
             self.ox = x - plat.x
             self.oy = y - plat.y
+            self.update()
         else:
             # Otherwise, set the absolute position.
             self.x = x
@@ -257,65 +763,174 @@ class Item:
         self.w = 30      # Width of the item.
         self.h = 30      # Height of the item.
         self.special = False  # Flag to indicate if the item gives a bonus (double score).
+        self.slot = 0    # Index of the item in its ItemStore.
 
     def update(self):
         # If the item is attached to a platform, update its absolute position based on the platform's movement.
+        # (Items in an ItemStore are moved all at once by ItemStore.place() instead.)
         if self.plat:
             self.x = self.plat.x + self.ox
             self.y = self.plat.y + self.oy
 
     def get_x(self):
-        # Ensure the item’s position is updated if attached to a platform.
-        if self.plat:
-            self.update()
+        # The item's position, as of the last platform movement.
         return self.x
 
     def get_y(self):
-        # Ensure the item’s position is updated if attached to a platform.
-        if self.plat:
-            self.update()
         return self.y
 
-    def draw(self, surf):
-        # Update position and draw the item image on the surface.
-        self.update()
-        surf.blit(item_img, (self.get_x(), self.get_y()))
-        # If the item is special, draw a rainbow-colored border around it.
+    def sprite(self, top=0):
+        # Return the item image and its screen position (`top` is the camera's world y).
+        # If the item is special, use the image with a rainbow-colored border around it.
         if self.special:
             # Determine which rainbow color to use based on the current time.
             idx = (pygame.time.get_ticks() // 100) % len(RAINBOW)
-            col = RAINBOW[idx]
-            # Draw the border with a 2-pixel thickness.
-            pygame.draw.rect(surf, col,
-                             (self.get_x()-2, self.get_y()-2,
-                              self.w+4, self.h+4), 2)
+            # (Offset from the whole-pixel position so the border always sits around the image.)
+            return sprites.special(idx), (int(self.x) - ITEM_BORDER, int(self.y - top) - ITEM_BORDER)
+        return item_img, (self.x, self.y - top)
+
+    def draw(self, surf, top=0):
+        # Draw the item and return the area drawn.
+        return surf.blit(*self.sprite(top))
+
+# ItemStore class: Holds the live items of a level.
+# Items attached to a platform are found through the platform broadphase grid
+# (each platform lists its own items), so looking up the items around the
+# player does not depend on how many items exist. Removal is O(1): the last
+# item is swapped into the removed item's slot.
+class ItemStore:
+    def __init__(self, plats):
+        self.plats = plats    # The level's PlatformArray.
+        self.items = []       # Every live item; `it.slot` is its index here.
+        self.on_plat = {}     # Platform -> list of items attached to it.
+        self.loose = []       # Items not attached to any platform.
+        # Range of item offsets relative to their platform, to widen platform queries.
+        self.min_ox = self.min_oy = 0
+        self.max_ox = self.max_oy = 0
+        self.max_size = 0     # Largest item width/height.
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, it):
+        return it.slot < len(self.items) and self.items[it.slot] is it
+
+    def append(self, it):
+        """Adds an item to the store."""
+        it.slot = len(self.items)
+        self.items.append(it)
+        self.max_size = max(self.max_size, it.w, it.h)
+        if it.plat:
+            self.on_plat.setdefault(it.plat, []).append(it)
+            self.min_ox = min(self.min_ox, it.ox)
+            self.max_ox = max(self.max_ox, it.ox)
+            self.min_oy = min(self.min_oy, it.oy)
+            self.max_oy = max(self.max_oy, it.oy)
+        else:
+            self.loose.append(it)
+
+    def remove(self, it):
+        """Removes an item in O(1) by moving the last item into its slot."""
+        last = self.items.pop()
+        if last is not it:
+            self.items[it.slot] = last
+            last.slot = it.slot
+        if it.plat:
+            owned = self.on_plat[it.plat]
+            owned.remove(it)   # A platform carries at most a couple of items.
+            if not owned:
+                del self.on_plat[it.plat]
+        else:
+            self.loose.remove(it)
+
+    def drop_platform(self, p):
+        """Removes every item attached to platform `p` (O(items on p))."""
+        for it in self.on_plat.pop(p, ()):
+            last = self.items.pop()
+            if last is not it:
+                self.items[it.slot] = last
+                last.slot = it.slot
+
+    def place(self):
+        """
+        Moves every attached item along with its platform: the positions are
+        gathered from the platform columns and offset in one numpy operation,
+        then stored in the items' x/y fields. Called once per tick after the
+        platforms moved, so collisions and drawing just read the fields.
+        """
+        items = [it for it in self.items if it.plat] if self.loose else self.items
+        n = len(items)
+        if not n:
+            return
+        plats = self.plats
+        rows = np.fromiter([it.plat._i for it in items], np.intp, n)
+        xs = plats.x[rows] + np.fromiter([it.ox for it in items], float, n)
+        ys = plats.y[rows] + np.fromiter([it.oy for it in items], float, n)
+        for it, x, y in zip(items, xs.tolist(), ys.tolist()):
+            it.x = x
+            it.y = y
+
+    def near(self, x0, y0, x1, y1):
+        """Returns the items that may overlap the rectangle (x0, y0)-(x1, y1)."""
+        # An attached item overlaps only if its platform is within the item
+        # offsets (plus the item size) of the rectangle.
+        s = self.max_size
+        plats = self.plats.near(x0 - self.max_ox - s, y0 - self.max_oy - s,
+                                x1 - self.min_ox, y1 - self.min_oy)
+        on_plat = self.on_plat
+        found = []
+        for p in plats:
+            owned = on_plat.get(p)
+            if owned:
+                found.extend(owned)
+        found.extend(self.loose)
+        return found
+
+    def sprites(self, top=0, bottom=None):
+        """
+        Returns the (sprite, screen position) pair of every item (`top` is the
+        camera's world y). With `bottom`, only the items that may be visible
+        between `top` and `bottom` are included, in the same order.
+        """
+        if bottom is None:
+            return [it.sprite(top) for it in self.items]
+        # Widen the view by the special items' border, which is drawn outside their hitbox.
+        b = ITEM_BORDER
+        found = self.near(-b, top - b, WIDTH + b, bottom + b)
+        found.sort(key=lambda it: it.slot)   # Keep the drawing order of the full list.
+        return [it.sprite(top) for it in found]
 
 # =====================
 # Helper Functions
 # =====================
 
-def gen_platform(y, dummy):
+def gen_platform(y, dummy, rng=random):
     """
     Generates a platform at a given vertical position.
     Randomly determines the platform width and horizontal position.
     Randomly flags some platforms as hazardous.
+    `rng` is the random.Random stream used for world generation.
     """
-    w = random.randint(50, 120)                 # Random width between 50 and 120 pixels.
-    x = random.randint(0, WIDTH - w)              # Random x position ensuring the platform fits on screen.
+    w = rng.randint(50, 120)                    # Random width between 50 and 120 pixels.
+    x = rng.randint(0, WIDTH - w)                 # Random x position ensuring the platform fits on screen.
     p = Platform(x, y, w)                         # Create a new platform.
-    p.hazard = (random.random() < 0.2)            # 20% chance to mark the platform as hazardous.
+    p.hazard = (rng.random() < 0.2)               # 20% chance to mark the platform as hazardous.
     return p
 
-def spawn_item(p):
+def spawn_item(p, rng=random):
     """
     Spawns an item on the provided platform with a probability of 60%.
     Also randomly designates the item as special.
+    `rng` is the random.Random stream used for world generation.
     """
-    if random.random() < 0.6:
-        x = random.randint(p.x, p.x + p.w - 30)   # Random x position on the platform (accounting for item width).
+    if rng.random() < 0.6:
+        x = rng.randint(int(p.x), int(p.x + p.w) - 30)  # Random x position on the platform (accounting for item width).
         y = p.y - 30                              # Place the item just above the platform.
         it = Item(x, y, p)                        # Create a new item attached to the platform.
-        it.special = (random.random() < 0.125)      # 12.5% chance for the item to be special.
+        it.special = (rng.random() < 0.125)       # 12.5% chance for the item to be special.
         return it
     return None
 
@@ -356,35 +971,37 @@ def start_screen():
         if ev.type == pygame.KEYDOWN and ev.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
             return True
 
-def init_game(lvl):
+def init_game(lvl, phys=None, rng=random):
     """
     Initializes the game state for the given level.
     Creates platforms, items, and positions the player on the starting platform.
+    `phys` holds the per-step speeds for the simulation rate and `rng` is the
+    random.Random stream used for world generation.
     """
-    plats = []  # List to store platforms.
-    its = []    # List to store items.
+    phys = phys or Physics()
+    plats = PlatformArray()  # Array-backed store for the platforms.
+    its = ItemStore(plats)  # Store for the items.
     
     # Create a starting platform at the bottom of the screen.
-    sw = random.randint(100, 200)                      # Random width for the starting platform.
-    sx = random.randint(0, WIDTH - sw)                 # Random x position for the starting platform.
+    sw = rng.randint(100, 200)                         # Random width for the starting platform.
+    sx = rng.randint(0, WIDTH - sw)                    # Random x position for the starting platform.
     sy = HEIGHT - 100                                  # y position near the bottom.
-    start_plat = Platform(sx, sy, sw)                  # Instantiate the starting platform.
+    start_plat = plats.add(sx, sy, sw)                 # Instantiate the starting platform.
     start_plat.hazard = False                          # Ensure the starting platform is not hazardous.
-    plats.append(start_plat)
     
     # Set the vertical position for the next platform.
-    y = sy - random.randint(80, 150)
+    y = sy - rng.randint(80, 150)
     # Determine spacing between platforms based on level.
     if lvl in (1, 2):
-        spacing = random.randint(80, 150)
+        spacing = rng.randint(80, 150)
     else:
-        spacing = int(random.randint(160, 300) / 1.6)
+        spacing = int(rng.randint(160, 300) / 1.6)
     
     # Generate platforms and items while the y coordinate is within screen bounds.
     while y > -HEIGHT:
-        p = gen_platform(y, 0)   # Generate a new platform.
+        p = gen_platform(y, 0, rng)  # Generate a new platform.
         plats.append(p)
-        it = spawn_item(p)       # Possibly spawn an item on the platform.
+        it = spawn_item(p, rng)      # Possibly spawn an item on the platform.
         if it:
             its.append(it)
         y -= spacing             # Move up by the spacing amount.
@@ -392,27 +1009,703 @@ def init_game(lvl):
     # For level 2, assign random horizontal and vertical velocities to platforms.
     if lvl == 2:
         for p in plats[1:]:
-            p.vx = random.choice([-3, -2, -1, 1, 2, 3])
-            p.vy = random.choice([-3, -2, -1, 1, 2, 3])
+            p.vx = rng.choice(phys.speeds)
+            p.vy = rng.choice(phys.speeds)
     # For level 3, set parameters for circular platform motion.
     if lvl == 3:
         for p in plats[1:]:
-            p.radius    = random.randint(50, 150)
-            p.angle     = random.uniform(0, 2 * math.pi)
-            p.cx        = WIDTH // 2 + random.randint(-100, 100)
+            p.radius    = rng.randint(50, 150)
+            p.angle     = rng.uniform(0, 2 * math.pi)
+            p.cx        = WIDTH // 2 + rng.randint(-100, 100)
             p.cy        = p.y
-            p.rot_speed = random.uniform(0.01, 0.05)
+            p.rot_speed = rng.uniform(*phys.rot)
     
     # Position the player on the starting platform.
-    player_x = start_plat.x + (start_plat.w - 50) // 2  # Center the player horizontally.
+    player_x = sx + (sw - 50) // 2                      # Center the player horizontally.
     player_y = start_plat.y - 50                        # Place the player above the platform.
-    player = Player(player_x, player_y)
+    player = Player(player_x, player_y, phys)
     # Store the player's respawn position.
     player.start_x = player_x
     player.start_y = player_y
     
     return player, plats, its
 
+# =====================
+# Simulation
+# =====================
+
+# Simulation states returned by GameSimulation.step().
+RUNNING    = "running"      # The level is still being played.
+GAME_OVER  = "game_over"    # The player ran out of lives.
+LEVEL_DONE = "level_done"   # The player reached the level's score goal.
+
+# Camera class: The part of the world shown on screen.
+# Everything in the simulation lives in world coordinates (y grows downward,
+# the level starts with the camera at 0); the camera's offset is only applied
+# when drawing, so scrolling is a single assignment.
+class Camera:
+    __slots__ = ("y",)
+
+    def __init__(self, y=0.0):
+        self.y = y  # World y-coordinate shown at the top of the screen.
+
+    def bottom(self):
+        """Returns the world y-coordinate of the bottom edge of the screen."""
+        return self.y + HEIGHT
+
+    def follow(self, target):
+        """
+        Scrolls up so `target` is never above a third of the screen.
+        Returns how far the camera moved (0 if it did not move).
+        """
+        limit = self.y + HEIGHT / 3
+        if target.y < limit:
+            off = limit - target.y
+            self.y -= off
+            return off
+        return 0
+
+# Inputs class: The player's input for a single tick, independent of pygame events.
+class Inputs:
+    # One Inputs is made per tick, so it is kept as small as possible.
+    __slots__ = ("jump", "left", "right", "skip")
+
+    def __init__(self, jump=False, left=False, right=False, skip=False):
+        self.jump = jump    # UP was pressed this tick.
+        self.left = left    # LEFT is held down.
+        self.right = right  # RIGHT is held down.
+        self.skip = skip    # Debug cheat: skip to the next level.
+
+def new_seed():
+    """Returns a fresh random 64-bit seed for a run."""
+    return random.SystemRandom().getrandbits(64)
+
+def seed_arg(text):
+    """
+    Parses a --seed value. Seeds are stored as 64-bit unsigned numbers in
+    replay files, so anything outside 0 <= seed < 2**64 is refused.
+    """
+    try:
+        seed = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"seed must be a whole number, not {text!r}")
+    if not 0 <= seed < 2 ** 64:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {2 ** 64 - 1}, not {text}")
+    return seed
+
+# ChunkMaker class: Makes the chunks of new world above the frontier. A chunk is
+# (platforms, items, new frontier); its platforms still live in their own
+# one-row stores and are adopted when appended to the level's PlatformArray.
+# Only `rng` (the world generation stream) is used, so the chunks are the same
+# whichever thread makes them.
+class ChunkMaker:
+    def __init__(self, lvl, phys, rng, frontier):
+        self.lvl = lvl            # Level the chunks are made for.
+        self.phys = phys          # Per-step physics constants (level 3 rotation speeds).
+        self.rng = rng            # World generation stream.
+        self.frontier = frontier  # World y of the last platform made.
+
+    def make(self):
+        """Makes the next CHUNK platforms above the frontier, with their items."""
+        rng = self.rng
+        plats, items = [], []
+        for _ in range(CHUNK):
+            if self.lvl in (1, 2):
+                spc = rng.randint(80, 150)
+            else:
+                spc = int(rng.randint(160, 300) / 1.6)
+            self.frontier -= spc
+            new_plat = gen_platform(self.frontier, 0, rng)
+            plats.append(new_plat)
+            new_it = spawn_item(new_plat, rng)
+            if new_it:
+                items.append(new_it)
+            if self.lvl == 3:
+                new_plat.radius    = rng.randint(50, 150)
+                new_plat.angle     = rng.uniform(0, 2 * math.pi)
+                new_plat.cx        = WIDTH // 2 + rng.randint(-100, 100)
+                new_plat.cy        = new_plat.y
+                new_plat.rot_speed = rng.uniform(*self.phys.rot)
+        return plats, items, self.frontier
+
+    def get(self):
+        """Returns the next chunk (made right away)."""
+        return self.make()
+
+    def close(self):
+        """Stops making chunks (nothing to do when they are made on demand)."""
+
+# ChunkWorker class: A ChunkMaker that makes the chunks in a background thread
+# and keeps up to `depth` of them ready in a bounded queue, so the main loop
+# only splices finished chunks in. get() blocks if the next chunk isn't ready.
+class ChunkWorker(ChunkMaker):
+    def __init__(self, lvl, phys, rng, frontier, depth=QUEUE_CHUNKS):
+        super().__init__(lvl, phys, rng, frontier)
+        self.ready = queue.Queue(depth)     # Finished chunks, oldest first.
+        self.stop = threading.Event()       # Set by close().
+        self.thread = threading.Thread(target=self.run, name="world-gen", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Worker thread: makes chunks until stopped, waiting while the queue is full."""
+        while not self.stop.is_set():
+            try:
+                chunk = self.make()
+            except Exception as e:
+                chunk = e   # Handed to get() so the error shows up in the main thread.
+            while not self.stop.is_set():
+                try:
+                    self.ready.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if isinstance(chunk, Exception):
+                return
+
+    def get(self):
+        chunk = self.ready.get()
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+
+# RandomBuffer class: Hands out the motion random numbers from a buffer drawn
+# from a NumPy Generator `size` numbers at a time, so the level 1 and 2 motion
+# steps pay for one Generator call every few hundred steps instead of several
+# per step. It has the random()/choice() calls the motion kernels use, with the
+# same distributions, and is as reproducible as the Generator it draws from.
+class RandomBuffer:
+    def __init__(self, rng, size=4096):
+        self.rng = rng            # Generator the numbers come from.
+        self.size = size          # Numbers drawn per refill.
+        self.buf = np.empty(0)    # Uniform numbers in [0, 1).
+        self.pos = 0              # Next unused number in buf.
+        self.seq = None           # Last sequence passed to choice() ...
+        self.arr = None           # ... and the same as an array.
+
+    def random(self, size):
+        """Returns the next `size` uniform numbers in [0, 1)."""
+        end = self.pos + size
+        if end > len(self.buf):
+            # Keep the unused tail and draw at least `size` new numbers behind it.
+            self.buf = np.concatenate((self.buf[self.pos:], self.rng.random(max(self.size, size))))
+            self.pos, end = 0, size
+        out = self.buf[self.pos:end]
+        self.pos = end
+        return out
+
+    def choice(self, a, size):
+        """Returns `size` elements of `a` picked uniformly at random."""
+        if a is not self.seq:
+            self.seq, self.arr = a, np.asarray(a)
+        return self.arr[(self.random(size) * len(self.arr)).astype(np.intp)]
+
+# GameSimulation class: Owns the state of one level and advances it one tick at a time.
+# It never touches the display, the clock or the mixer, so it can run headless.
+# All randomness comes from two streams derived from `seed`: one for world
+# generation and one for platform motion, so a run is fully reproducible and
+# never touches the global random state.
+class GameSimulation:
+    def __init__(self, lvl, rate=SIM_RATE, seed=None, threaded=False):
+        self.lvl = lvl                  # Current level (1-3).
+        self.goal = level_goals[lvl-1]  # Score needed to finish the level.
+        self.phys = Physics(rate)       # Per-step physics constants.
+        # Derive the independent random streams from the seed (and the level,
+        # so every level of a run gets its own world).
+        self.seed = new_seed() if seed is None else seed
+        gen_seq, motion_seq = np.random.SeedSequence([self.seed, lvl]).spawn(2)
+        self.gen_rng = random.Random(int(gen_seq.generate_state(2, np.uint64)[0]))
+        self.motion_rng = np.random.default_rng(motion_seq)
+        self.motion_buf = RandomBuffer(self.motion_rng)  # Pre-drawn numbers for the motion steps.
+        # Initialize the player, platforms and items for the level.
+        self.player, self.plats, self.items = init_game(lvl, self.phys, self.gen_rng)
+        # World y of the newest platform's spawn height; generation continues above it.
+        self.frontier = self.plats.y[:self.plats.n].min()
+        # New world comes in chunks, made in a background thread if `threaded`
+        # (from here on only the chunk maker uses gen_rng, so both give the same world).
+        maker = ChunkWorker if threaded else ChunkMaker
+        self.chunks = maker(lvl, self.phys, self.gen_rng, self.frontier)
+        self.cam = Camera()      # View into the world.
+        self.ticks = 0           # Number of ticks simulated so far.
+        self.collected = 0       # Items collected during the last tick.
+        self.status = RUNNING    # Current state of the level.
+        self.prof = None         # Optional FrameProfiler timing the phases of step().
+
+    def now(self):
+        """Returns the simulated time in milliseconds since the level started."""
+        return self.ticks * 1000 // self.phys.rate
+
+    def digest(self):
+        """Returns a checksum of the simulation state (to check that a replay matches)."""
+        p, n = self.player, self.plats.n
+        crc = zlib.crc32(struct.pack("<BIddddii", self.lvl, self.ticks, p.x, p.y, p.vy,
+                                     self.cam.y, p.score, p.lives))
+        crc = zlib.crc32(self.plats.x[:n].tobytes(), crc)
+        crc = zlib.crc32(self.plats.y[:n].tobytes(), crc)
+        return zlib.crc32(struct.pack("<I", len(self.items)), crc)
+
+    def step(self, inputs):
+        """
+        Advances the simulation by exactly one tick using the given Inputs.
+        Returns the simulation status (RUNNING, GAME_OVER or LEVEL_DONE).
+        """
+        if self.status != RUNNING:
+            return self.status
+        player = self.player
+        prof = self.prof
+        self.ticks += 1
+
+        # Apply the discrete inputs first, in the same order as the event loop did.
+        if inputs.jump:
+            player.jump()
+        if inputs.skip:
+            # Debug cheat: reach the goal and force a level transition.
+            player.score = self.goal
+            player.y = self.cam.bottom() + 1
+        # Apply held movement keys.
+        if inputs.left:
+            player.move_left()
+        if inputs.right:
+            player.move_right()
+
+        # Update the player state with collision checks against platforms.
+        player.update(self.plats)
+        if prof:
+            prof.lap("update")
+        # Check for item collection.
+        self.collected = player.collect(self.items, self.now())
+        if prof:
+            prof.lap("collect")
+
+        # If the player falls below the screen, treat it as a hit.
+        if player.y > self.cam.bottom():
+            if player.lives > 0:
+                player.hit()
+            else:
+                self.status = GAME_OVER
+                return self.status
+        if not player.alive:
+            self.status = GAME_OVER
+            return self.status
+        # Stop once the player meets the level's score goal.
+        if player.score >= self.goal:
+            self.status = LEVEL_DONE
+            return self.status
+
+        self.scroll()
+        if prof:
+            prof.lap("scroll")
+        self.cull()
+        if prof:
+            prof.lap("cull")
+        self.generate()
+        if prof:
+            prof.lap("generate")
+        self.move_platforms()
+        if prof:
+            prof.lap("motion")
+        return self.status
+
+    def scroll(self):
+        """Moves the camera up when the player climbs above a third of the screen."""
+        off = self.cam.follow(self.player)
+        # The respawn point stays at the same place on the screen.
+        self.player.start_y -= off
+
+    def cull(self):
+        """Removes platforms and items that are below the bottom of the screen."""
+        # Only the platforms that left the screen are touched; their items go with them.
+        # below() lists the last rows first, so each swap-removal only moves kept rows.
+        bottom = self.cam.bottom()
+        for p in self.plats.below(bottom):
+            self.items.drop_platform(p)
+            self.plats.remove(p)
+        # Remove loose items that are no longer visible.
+        for it in self.items.loose[:]:
+            if it.get_y() >= bottom:
+                self.items.remove(it)
+
+    def generate(self):
+        """
+        Splices in whole chunks of platforms (and items) until the world reaches
+        LOOKAHEAD pixels above the camera, at most GEN_CHUNKS chunks per step.
+        The frontier is tracked as chunks come in, so there is no scan over
+        the existing platforms.
+        """
+        for _ in range(GEN_CHUNKS):
+            if self.frontier <= self.cam.y - LOOKAHEAD:
+                break
+            plats, items, self.frontier = self.chunks.get()
+            for p in plats:
+                self.plats.append(p)
+            for it in items:
+                self.items.append(it)
+
+    def close(self):
+        """Stops the background world generation (if any)."""
+        self.chunks.close()
+
+    def move_platforms(self):
+        """Applies the level-specific platform movement for one tick; the items move along."""
+        if self.lvl == 1:
+            # For level 1, platforms slide horizontally.
+            self.plats.slide_step(self.phys, self.motion_buf)
+        elif self.lvl == 2:
+            # For level 2, platforms move in both horizontal and vertical directions.
+            self.plats.bounce_step(self.phys, self.motion_buf, self.cam.y)
+        else:
+            # For level 3, platforms follow a circular path.
+            self.plats.orbit_step()
+        self.items.place()
+
+# LevelLoader class: Builds a level's GameSimulation in a background thread (e.g.
+# while the transition screen waits for ENTER), including its broadphase grid
+# and first queued chunks, so the new level starts without a hitch.
+class LevelLoader:
+    def __init__(self, lvl, rate=SIM_RATE, seed=None, threaded=True):
+        self.sim = None     # The finished level.
+        self.error = None   # Exception raised while building it, if any.
+        self.thread = threading.Thread(target=self.run, args=(lvl, rate, seed, threaded),
+                                       name="level-loader", daemon=True)
+        self.thread.start()
+
+    def run(self, lvl, rate, seed, threaded):
+        """Loader thread: builds the level."""
+        try:
+            sim = GameSimulation(lvl, rate, seed, threaded)
+            sim.plats.rebin()   # Bin the platforms now instead of on the first step.
+            self.sim = sim
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        """Waits for the level to be built and returns it."""
+        self.thread.join()
+        if self.error:
+            raise self.error
+        return self.sim
+
+# FixedStep class: Decides how many fixed-length simulation steps to run for each
+# rendered frame. Leftover time carries over to the next frame; after a long
+# hitch only MAX_CATCHUP steps are run and the rest of the backlog is dropped.
+class FixedStep:
+    def __init__(self, rate=SIM_RATE, max_steps=MAX_CATCHUP):
+        self.dt = 1.0 / rate          # Length of one step in seconds.
+        self.max_steps = max_steps    # Most steps run for a single frame.
+        self.acc = 0.0                # Real time not simulated yet (seconds).
+
+    def reset(self):
+        """Forgets any leftover time (e.g. after a pause)."""
+        self.acc = 0.0
+
+    def advance(self, seconds):
+        """Adds `seconds` of real time and returns how many steps to run now."""
+        self.acc += seconds
+        steps = int(self.acc / self.dt)
+        if steps > self.max_steps:
+            # Too far behind: catch up as much as allowed and drop the backlog.
+            self.acc = 0.0
+            return self.max_steps
+        self.acc -= steps * self.dt
+        return steps
+
+# Replay class: A recorded run: its seed, the simulation rate and the inputs of
+# every simulation step. Since the simulation is deterministic, this is enough
+# to play the run back exactly.
+# File layout: a header (magic, rate, seed, checksum of the final state)
+# followed by run-length encoded steps (input bits, number of steps).
+class Replay:
+    MAGIC  = b"PJR4"   # Bumped whenever world generation changes (old runs would diverge).
+    HEADER = struct.Struct("<4sHQI")
+    RUN    = struct.Struct("<BH")
+    # Input bits stored for each step.
+    JUMP, LEFT, RIGHT, SKIP = 1, 2, 4, 8
+
+    def __init__(self, seed, rate=SIM_RATE):
+        self.seed = seed            # Seed of the run.
+        self.rate = rate            # Simulation steps per second.
+        self.steps = bytearray()    # Input bits of every step, in order.
+        self.digest = 0             # GameSimulation.digest() at the end (0 if unknown).
+
+    def record(self, inputs):
+        """Appends the inputs of one simulation step."""
+        self.steps.append((self.JUMP if inputs.jump else 0) |
+                          (self.LEFT if inputs.left else 0) |
+                          (self.RIGHT if inputs.right else 0) |
+                          (self.SKIP if inputs.skip else 0))
+
+    def inputs(self):
+        """Yields the recorded Inputs, one per simulation step."""
+        for b in self.steps:
+            yield Inputs(bool(b & self.JUMP), bool(b & self.LEFT),
+                         bool(b & self.RIGHT), bool(b & self.SKIP))
+
+    def save(self, path):
+        """Writes the replay to a binary file."""
+        out = bytearray(self.HEADER.pack(self.MAGIC, self.rate, self.seed, self.digest))
+        i, steps = 0, self.steps
+        while i < len(steps):
+            # Count how many steps in a row have the same inputs (up to 65535).
+            j = i + 1
+            while j < len(steps) and steps[j] == steps[i] and j - i < 0xFFFF:
+                j += 1
+            out += self.RUN.pack(steps[i], j - i)
+            i = j
+        with open(path, "wb") as f:
+            f.write(out)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a replay written by save(); raises ValueError for a damaged or foreign file."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size or data[:4] != cls.MAGIC:
+            raise ValueError(f"{path} is not a replay file (or is from another version of the game)")
+        magic, rate, seed, digest = cls.HEADER.unpack_from(data)
+        if rate == 0 or (len(data) - cls.HEADER.size) % cls.RUN.size:
+            raise ValueError(f"{path} is damaged")
+        rep = cls(seed, rate)
+        rep.digest = digest
+        for bits, count in cls.RUN.iter_unpack(data[cls.HEADER.size:]):
+            rep.steps += bytes((bits,)) * count
+        return rep
+
+def play_replay(replay):
+    """
+    Re-drives the simulation from a recorded run, without a display.
+    Returns the last GameSimulation; its digest() equals replay.digest
+    when the run was reproduced exactly.
+    """
+    lvl = 1
+    sim = GameSimulation(lvl, replay.rate, replay.seed)
+    left = len(replay.steps)
+    for inputs in replay.inputs():
+        status = sim.step(inputs)
+        left -= 1
+        if status == RUNNING:
+            continue
+        # Only start the next level if the recording went on to play it.
+        if status == LEVEL_DONE and lvl < 3 and left:
+            lvl += 1
+            sim = GameSimulation(lvl, replay.rate, replay.seed)
+        else:
+            break
+    return sim
+
+# FrameProfiler class: Times the phases of every frame with perf_counter_ns and
+# keeps the last `history` frames for the performance overlay (toggled with F3).
+class FrameProfiler:
+    PHASES = ("events", "update", "collect", "scroll", "cull", "generate", "motion",
+              "draw", "hud", "overlay", "flip", "wait")
+
+    def __init__(self, history=240):
+        self.frames = collections.deque(maxlen=history)  # Phase times (ns) of past frames.
+        self.lines = []     # Rendered overlay text.
+        self.age = 0        # Frames since the overlay text was rendered.
+        self.restart()
+
+    def restart(self):
+        """Starts the current frame over (e.g. after a blocking screen)."""
+        self.cur = dict.fromkeys(self.PHASES, 0)
+        self.t = time.perf_counter_ns()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap to `phase`."""
+        now = time.perf_counter_ns()
+        self.cur[phase] += now - self.t
+        self.t = now
+
+    def end_frame(self):
+        """Stores the current frame's phase times and starts the next frame."""
+        self.frames.append(self.cur)
+        self.cur = dict.fromkeys(self.PHASES, 0)
+
+    def stats(self):
+        """
+        Returns (fps, p50 ms, p99 ms, {phase: mean ms}) over the stored frames.
+        The percentiles are of the busy time (the frame without the "wait"
+        phase), since with the frame cap on the whole frame is always ~16.7 ms.
+        """
+        n = len(self.frames)
+        if not n:
+            return 0.0, 0.0, 0.0, {}
+        fps = n * 1e9 / sum(sum(f.values()) for f in self.frames)
+        busy = sorted(sum(f.values()) - f["wait"] for f in self.frames)
+        p50 = busy[n // 2] / 1e6
+        p99 = busy[min(n - 1, int(n * 0.99))] / 1e6
+        phases = {p: sum(f[p] for f in self.frames) / n / 1e6 for p in self.PHASES}
+        return fps, p50, p99, phases
+
+# RenderQueue class: Collects (surface, position) pairs and submits them to the
+# screen in a single Surface.blits call instead of one blit call per object.
+class RenderQueue:
+    def __init__(self):
+        self.queue = []   # (surface, position) pairs in drawing order.
+
+    def add(self, surf, pos):
+        """Queues one blit."""
+        self.queue.append((surf, pos))
+
+    def extend(self, pairs):
+        """Queues many (surface, position) pairs."""
+        self.queue.extend(pairs)
+
+    def submit(self, target, areas=False):
+        """
+        Blits everything queued onto `target` and empties the queue.
+        Returns the list of areas drawn if `areas` is set, otherwise None.
+        """
+        drawn = target.blits(self.queue, doreturn=areas)
+        self.queue.clear()
+        return drawn
+
+# Hud class: Draws the in-game HUD without rasterizing text every frame.
+# The status line is re-rendered only when level, score, goal or lives change;
+# the timers are composed from a pre-rendered atlas of digit glyphs.
+class Hud:
+    GLYPHS = "0123456789."
+
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = {c: font.render(c, True, WHITE) for c in self.GLYPHS}  # Digit atlas.
+        self.time_label = font.render("Time: ", True, WHITE)
+        self.sec_label = font.render(" sec", True, WHITE)
+        self.dbl_label = font.render("Double: ", True, WHITE)
+        self.s_label = font.render("s", True, WHITE)
+        self.status = None      # (level, score, goal, lives) shown by status_surf.
+        self.status_surf = None
+
+    def width(self, text):
+        """Returns the width in pixels of `text` drawn from the digit atlas."""
+        return sum(self.glyphs[c].get_width() for c in text)
+
+    def digits(self, surf, text, x, y):
+        """Blits `text` glyph by glyph from the digit atlas; returns the x after it."""
+        for c in text:
+            g = self.glyphs[c]
+            surf.blit(g, (x, y))
+            x += g.get_width()
+        return x
+
+    def draw(self, surf, sim, ttime):
+        """
+        Draws the status line, the timer and the double score countdown.
+        Returns the list of areas drawn.
+        """
+        player = sim.player
+        # Render and display game info such as level, score, goal, and lives.
+        status = (sim.lvl, player.score, sim.goal, player.lives)
+        if status != self.status:
+            s_txt = "Level: {}  Score: {}  Goal: {}  Lives: {}".format(*status)
+            self.status_surf = self.font.render(s_txt, True, WHITE)
+            self.status = status
+        areas = [surf.blit(self.status_surf, (10, 10))]
+        # Display elapsed time.
+        area = surf.blit(self.time_label, (10, 40))
+        x = self.digits(surf, f"{ttime:.2f}", 10 + self.time_label.get_width(), 40)
+        areas.append(area.union(surf.blit(self.sec_label, (x, 40))))
+        # Display remaining time for double score effect if active.
+        now = sim.now()
+        if now < player.double_end:
+            left = f"{(player.double_end - now) / 1000:.1f}"
+            w = self.dbl_label.get_width() + self.width(left) + self.s_label.get_width()
+            x = WIDTH - w - 10
+            area = surf.blit(self.dbl_label, (x, 10))
+            x = self.digits(surf, left, x + self.dbl_label.get_width(), 10)
+            areas.append(area.union(surf.blit(self.s_label, (x, 10))))
+        return areas
+
+def draw_overlay(surf, font, prof, sim):
+    """
+    Draws the performance overlay: FPS, p50/p99 busy time, object counts
+    and the mean time of every phase. Returns the area drawn.
+    """
+    # Text rendering is costly, so the overlay is only re-rendered a few times per second.
+    if prof.age <= 0:
+        fps, p50, p99, phases = prof.stats()
+        texts = [f"FPS {fps:.0f}   busy p50 {p50:.2f} ms  p99 {p99:.2f} ms",
+                 f"platforms {len(sim.plats)}   items {len(sim.items)}"]
+        texts += [f"{p:<9} {ms:6.3f} ms" for p, ms in phases.items()]
+        prof.lines = [font.render(t, True, WHITE) for t in texts]
+        prof.age = FPS // 4
+    prof.age -= 1
+    h = sum(l.get_height() for l in prof.lines)
+    w = max(l.get_width() for l in prof.lines)
+    y = HEIGHT - h - 10
+    area = surf.fill(BLACK, (5, y - 5, w + 10, h + 10))
+    for line in prof.lines:
+        surf.blit(line, (10, y))
+        y += line.get_height()
+    return area
+
+# DirtyRects class: Optional dirty-rectangle presentation (--dirty).
+# While the camera stands still, only the areas drawn in the previous frame are
+# cleared and only those and the newly drawn areas are pushed to the display.
+# The first frame and every frame where the camera scrolled are redrawn in full.
+class DirtyRects:
+    def __init__(self):
+        self.old = None   # Areas drawn in the previous frame (None: redraw everything).
+        self.top = None   # Camera y of the previous frame.
+
+    def reset(self):
+        """Forces a full redraw (e.g. after another screen was shown)."""
+        self.old = None
+
+    def begin(self, top):
+        """
+        Returns the areas to clear for a frame with the camera at `top`,
+        or None when the whole screen has to be redrawn.
+        """
+        if top != self.top:
+            self.old = None
+            self.top = top
+        return self.old
+
+    def present(self, areas):
+        """Pushes the frame's `areas` (and the cleared ones) to the display."""
+        if self.old is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.old + areas)
+        # Off-screen objects give empty areas; they need neither clearing nor updating.
+        self.old = [a for a in areas if a]
+
+def draw_game(surf, hud, sim, ttime, prof=None, rects=None):
+    """
+    Draws one frame of the given simulation: platforms, items, the player and the HUD.
+    `hud` is the Hud drawing the game info, `ttime` is the total play time in seconds
+    shown by the timer and `prof` is an optional FrameProfiler. With `rects` (a
+    DirtyRects), only the previous frame's areas are cleared while the camera
+    stands still, and the list of areas drawn is returned for rects.present().
+    """
+    top = sim.cam.y
+    # Clear the screen (or the previous frame's areas) for the next frame.
+    clear = rects.begin(top) if rects else None
+    if clear is None:
+        surf.fill(BLACK)
+    else:
+        for area in clear:
+            surf.fill(BLACK, area)
+    # Draw the visible platforms and items and the player relative to the camera,
+    # in one blits call.
+    bottom = sim.cam.bottom()
+    queue = RenderQueue()
+    queue.extend(sim.plats.sprites(top, bottom))
+    queue.extend(sim.items.sprites(top, bottom))
+    queue.add(*sim.player.sprite(top))
+    areas = queue.submit(surf, rects is not None) or []
+    if prof:
+        prof.lap("draw")
+
+    # Draw the level, score, goal, lives and timers.
+    areas += hud.draw(surf, sim, ttime)
+    if prof:
+        prof.lap("hud")
+    return areas
+
 def level_trans(font, lvl, ttime):
     """
     Displays a level transition screen with instructions to continue.
@@ -587,11 +1880,16 @@ def game_over(font, sc, needed, lvl):
     pygame.time.wait(5000)  # Wait 5 seconds before closing game over screen.
     return False
 
-def main():
+def main(replay, playback=False, dirty=False):
     """
     Main game loop:
-    Handles initialization, event processing, game state updates, level transitions,
-    and rendering.
+    Turns pygame events into Inputs, steps the GameSimulation, handles level
+    transitions, and renders each frame.
+    The inputs of every step are recorded into `replay` (whose seed and rate
+    are used for the run). With `playback`, the inputs come from `replay`
+    instead of the keyboard, and the end screens are skipped. With `dirty`,
+    only the changed parts of the screen are redrawn while the camera stands still.
+    Returns the last GameSimulation.
     """
     global level_scores
     clock = pygame.time.Clock()  # Create a clock object to control the frame rate.
@@ -599,197 +1897,177 @@ def main():
     total_time = 0.0  # Variable to accumulate total game time.
     
     # Display the start screen and exit if the user closes the window.
-    if not start_screen():
+    if not playback and not start_screen():
         pygame.quit()
-        return
+        return None
     
     lvl = 1  # Start at level 1.
     level_scores = [None, None, None]  # Reset level scores.
-    # Initialize game objects for the first level.
-    player, plats, items = init_game(lvl)
+    # Create the simulation for the first level; every level of the run is
+    # generated from the replay's seed.
+    sim = GameSimulation(lvl, replay.rate, replay.seed, threaded=True)
+    prof = FrameProfiler()  # Times every phase of the frame.
+    sim.prof = prof
+    hud = Hud(font)         # Cached HUD text.
+    prof_font = pygame.font.SysFont(None, 22)  # Font for the performance overlay.
+    show_prof = False       # Whether the performance overlay is shown (F3).
+    rects = DirtyRects() if dirty else None  # Dirty-rectangle presentation (optional).
+    stepper = FixedStep(replay.rate)  # Runs the simulation at a fixed rate whatever the frame rate.
+    inputs = Inputs()      # Inputs waiting for the next simulation step.
+    recorded = replay.inputs() if playback else None  # Inputs played back.
+    sim_steps = 0          # Simulation steps run so far (over all levels).
+    frame_ms = 1000 / FPS  # Duration of the previous frame.
     start_time = pygame.time.get_ticks()  # Mark the start time of the level.
+    clock.tick()  # Don't count the time spent on the start screen and level setup.
     running = True  # Flag to control the main game loop.
     
     while running:
-        # Process all pending events.
+        # Translate pending events into inputs.
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 running = False
                 break
             if ev.type == pygame.KEYDOWN:
                 if ev.key == pygame.K_UP:
-                    player.jump()  # Handle jump on UP key.
+                    inputs.jump = True  # Handle jump on UP key.
                 elif ev.key == pygame.K_l:
-                    # Debug cheat: skip to next level.
-                    player.score = level_goals[lvl-1]
-                    player.y = HEIGHT + 1  # Force a level transition.
+                    inputs.skip = True  # Debug cheat: skip to next level.
+                elif ev.key == pygame.K_F3:
+                    show_prof = not show_prof  # Toggle the performance overlay.
         if not running:
             break
         
         # Handle continuous key presses for left/right movement.
         keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            player.move_left()
-        if keys[pygame.K_RIGHT]:
-            player.move_right()
-        
-        # Update the player state with collision checks against platforms.
-        player.update(plats)
-        # Check for item collection.
-        player.collect(items)
+        inputs.left = keys[pygame.K_LEFT]
+        inputs.right = keys[pygame.K_RIGHT]
+        prof.lap("events")
         
-        # If the player falls below the screen, treat it as a hit.
-        if player.y > HEIGHT:
-            if player.lives > 0:
-                player.hit()
+        # Advance the game world by as many fixed steps as the last frame took.
+        status = RUNNING
+        collected = 0
+        for _ in range(stepper.advance(frame_ms / 1000)):
+            if playback:
+                inputs = next(recorded, None)
+                if inputs is None:
+                    running = False  # The recording is over.
+                    break
             else:
-                level_scores[lvl-1] = player.score
-                left = level_goals[lvl-1] - player.score
-                if left < 0:
-                    left = 0
-                game_over(font, player.score, left, lvl)
+                replay.record(inputs)
+            status = sim.step(inputs)
+            sim_steps += 1
+            collected += sim.collected
+            # UP and the cheat key are one-off events: only one step sees them.
+            inputs.jump = inputs.skip = False
+            if status != RUNNING:
                 break
-        if not player.alive:
-            level_scores[lvl-1] = player.score
-            left = level_goals[lvl-1] - player.score
+        if not running:
+            break
+        # Play a sound effect if an item was collected and one is loaded.
+        if collected and collect_sound:
+            collect_sound.play()
+        
+        if status == GAME_OVER:
+            if playback:
+                break
+            level_scores[lvl-1] = sim.player.score
+            left = level_goals[lvl-1] - sim.player.score
             if left < 0:
                 left = 0
-            game_over(font, player.score, left, lvl)
+            game_over(font, sim.player.score, left, lvl)
             break
         
-        # If the player meets the level's score goal, proceed to next level or victory.
-        if player.score >= level_goals[lvl-1]:
-            level_scores[lvl-1] = player.score
+        # If the player met the level's score goal, proceed to next level or victory.
+        if status == LEVEL_DONE:
+            level_scores[lvl-1] = sim.player.score
             elapsed = (pygame.time.get_ticks() - start_time) / 1000
             total_time += elapsed
             if lvl < 3:
-                cont = level_trans(font, lvl, total_time)
+                # Build the next level while the transition screen is shown.
+                loader = LevelLoader(lvl + 1, replay.rate, replay.seed)
+                if playback:
+                    # Only start the next level if the recording went on to play it.
+                    cont = len(replay.steps) > sim_steps
+                else:
+                    cont = level_trans(font, lvl, total_time)
                 if not cont:
+                    loader.result().close()
                     break
                 lvl += 1
-                player, plats, items = init_game(lvl)
+                sim.close()
+                sim = loader.result()
+                sprites.warm(sim.plats)  # Render the new level's sprites before its first frame.
+                sim.prof = prof
+                stepper.reset()
+                clock.tick()  # Don't count the time spent on the transition screen.
+                prof.restart()
+                if rects:
+                    rects.reset()
                 start_time = pygame.time.get_ticks()
             else:
-                victory(font, total_time, player.score)
+                if not playback:
+                    victory(font, total_time, sim.player.score)
                 break
         
-        # If the player moves high up the screen, scroll the platforms and items downward.
-        if player.y < HEIGHT / 3:
-            off = (HEIGHT / 3) - player.y
-            player.y += off
-            for p in plats:
-                p.y += off
-                # For level 3, adjust the center of circular motion.
-                if lvl == 3 and hasattr(p, 'cy'):
-                    p.cy += off
-            for it in items:
-                if not it.plat:
-                    it.y += off
-        
-        # Remove platforms that have scrolled off the bottom of the screen.
-        plats = [p for p in plats if p.y < HEIGHT]
-        # Filter out items that are no longer visible.
-        new_items = []
-        for it in items:
-            if it.plat:
-                if it.plat in plats:
-                    new_items.append(it)
-            else:
-                if it.get_y() < HEIGHT:
-                    new_items.append(it)
-        items = new_items
-        
-        # Generate new platforms if the topmost platform is still visible.
-        if plats:
-            top_y = min(p.y for p in plats)
-            if lvl in (1, 2):
-                spc = random.randint(80, 150)
-            else:
-                spc = int(random.randint(160, 300) / 1.6)
-            if top_y > 0:
-                new_y = top_y - spc
-                new_plat = gen_platform(new_y, player.vy)
-                plats.append(new_plat)
-                new_it = spawn_item(new_plat)
-                if new_it:
-                    items.append(new_it)
-                if lvl == 3:
-                    new_plat.radius    = random.randint(50, 150)
-                    new_plat.angle     = random.uniform(0, 2 * math.pi)
-                    new_plat.cx        = WIDTH // 2 + random.randint(-100, 100)
-                    new_plat.cy        = new_plat.y
-                    new_plat.rot_speed = random.uniform(0.01, 0.05)
-        
-        # Level-specific platform movements:
-        if lvl == 1:
-            # For level 1, platforms slide horizontally.
-            for p in plats:
-                if p.slide is None:
-                    p.slide = random.choice([-3, -2, -1, 1, 2, 3])
-                p.x += p.slide
-                if random.random() < 0.01:
-                    p.slide = random.choice([-3, -2, -1, 1, 2, 3])
-                if p.x < 0:
-                    p.x = 0
-                    p.slide = abs(p.slide)
-                if p.x + p.w > WIDTH:
-                    p.x = WIDTH - p.w
-                    p.slide = -abs(p.slide)
-        elif lvl == 2:
-            # For level 2, platforms move in both horizontal and vertical directions.
-            for p in plats:
-                p.x += p.vx
-                p.y += p.vy
-                if random.random() < 0.01:
-                    p.vx = random.choice([-3, -2, -1, 1, 2, 3])
-                if random.random() < 0.01:
-                    p.vy = random.choice([-3, -2, -1, 1, 2, 3])
-                if p.x < 0 or p.x + p.w > WIDTH:
-                    p.vx *= -1
-                if p.y < 0 or p.y + p.h > HEIGHT:
-                    p.vy *= -1
-        else:
-            # For level 3, platforms follow a circular path.
-            for p in plats:
-                p.x = p.cx + p.radius * math.cos(p.angle) - p.w / 2
-                p.y = p.cy + p.radius * math.sin(p.angle) - p.h / 2
-                p.angle += p.rot_speed
-        
-        # Clear the screen for the next frame.
-        screen.fill(BLACK)
-        # Draw platforms.
-        for p in plats:
-            p.draw(screen)
-        # Draw items.
-        for it in items:
-            it.draw(screen)
-        # Draw the player.
-        player.draw(screen)
-        
-        # Render and display game info such as level, score, goal, and lives.
-        s_txt = f"Level: {lvl}  Score: {player.score}  Goal: {level_goals[lvl-1]}  Lives: {player.lives}"
-        info = font.render(s_txt, True, WHITE)
-        screen.blit(info, (10, 10))
-        # Render and display elapsed time.
+        # Draw the world and HUD for this frame.
         cur_time = (pygame.time.get_ticks() - start_time) / 1000
-        t_txt = f"Time: {total_time + cur_time:.2f} sec"
-        time_surf = font.render(t_txt, True, WHITE)
-        screen.blit(time_surf, (10, 40))
-        # Display remaining time for double score effect if active.
-        now = pygame.time.get_ticks()
-        if now < player.double_end:
-            left = (player.double_end - now) / 1000
-            dbl_surf = font.render(f"Double: {left:.1f}s", True, WHITE)
-            screen.blit(dbl_surf, (WIDTH - dbl_surf.get_width() - 10, 10))
+        areas = draw_game(screen, hud, sim, total_time + cur_time, prof, rects)
+        if show_prof:
+            areas.append(draw_overlay(screen, prof_font, prof, sim))
+        prof.lap("overlay")
         
         # Update the display with the new frame.
-        pygame.display.flip()
-        # Cap the frame rate at 60 frames per second.
-        clock.tick(60)
+        if rects:
+            rects.present(areas)
+        else:
+            pygame.display.flip()
+        prof.lap("flip")
+        # Cap the frame rate at FPS frames per second.
+        frame_ms = clock.tick(FPS)
+        prof.lap("wait")
+        prof.end_frame()
     
-    # Quit pygame once the game loop is exited.
+    # Stop the world generation and quit pygame once the game loop is exited.
+    sim.close()
     pygame.quit()
+    return sim
+
+def run(argv=None):
+    """
+    Entry point: parses the command line, creates the window and assets,
+    then plays (or plays back) the game.
+    """
+    parser = argparse.ArgumentParser(description="Infinite Cat Jumper")
+    parser.add_argument("--seed", type=seed_arg, help="seed for the run (random by default)")
+    parser.add_argument("--record", metavar="FILE", help="save the run's inputs to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play back a run saved with --record")
+    parser.add_argument("--dirty", action="store_true",
+                        help="redraw only the changed parts of the screen (faster software rendering)")
+    parser.add_argument("--load-times", action="store_true", help="print how long each asset took to load")
+    args = parser.parse_args(argv)
+    if args.replay and (args.seed is not None or args.record):
+        parser.error("--replay can't be combined with --seed or --record")
+
+    if args.replay:
+        try:
+            replay = Replay.load(args.replay)
+        except (OSError, ValueError, struct.error) as e:
+            parser.error(f"can't load the replay: {e}")
+    else:
+        replay = Replay(new_seed() if args.seed is None else args.seed)
+    init_app(args.load_times)
+    sim = main(replay, playback=bool(args.replay), dirty=args.dirty)
+    if sim is None:
+        return
+    if args.replay:
+        # Tell whether the playback ended in exactly the recorded state.
+        if replay.digest:
+            same = sim.digest() == replay.digest
+            print("Replay matches the recording." if same else "Replay diverged from the recording!")
+    elif args.record:
+        replay.digest = sim.digest()
+        replay.save(args.record)
 
 # Entry point for the game.
 if __name__ == "__main__":
-    main()
+    run()